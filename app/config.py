@@ -0,0 +1,117 @@
+import os
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Settings(BaseSettings):
+    """
+    Application settings, read once from the environment and the project's ``.env`` file
+    (environment variables take precedence). Each field is set by the environment variable of
+    the same name in upper case, e.g. ``LLM_TIMEOUT_SECONDS``.
+    """
+
+    model_config = SettingsConfigDict(env_file=os.path.join(ROOT_DIR, ".env"), extra="ignore")
+
+    # Auth
+    secret_key: Optional[str] = None
+    admin_emails: str = ""  # Comma-separated
+    user_cache_max_entries: int = 10000
+    user_cache_ttl_seconds: float = 300
+    password_hash_executor: str = "thread"
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 32
+    password_hash_retry_after_seconds: int = 1
+    bcrypt_rounds: int = 12
+
+    # PostgreSQL
+    database_url: Optional[str] = None  # Overrides the POSTGRES_* settings
+    postgres_db: Optional[str] = None
+    postgres_user: Optional[str] = None
+    postgres_password: Optional[str] = None
+    postgres_host: Optional[str] = None
+    postgres_port: str = "5432"
+    postgres_pool_size: int = 10
+    postgres_max_overflow: int = 10
+    postgres_pool_timeout: float = 30
+    postgres_pool_recycle: int = 1800
+    postgres_pool_pre_ping: bool = True
+    postgres_statement_cache_size: int = 100
+    sql_echo: bool = False
+    migrate_on_startup: bool = False
+
+    # MongoDB
+    mongo_uri: Optional[str] = None
+    mongo_db_name: str = "pdf_storage"
+    mongo_max_pool_size: int = 100
+
+    # Gemini
+    gemini_api_key: Optional[str] = None
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta/openai/"
+    gemini_model: str = "gemini-2.0-flash"
+    llm_timeout_seconds: float = 60
+    llm_connect_timeout_seconds: float = 5
+    llm_deadline_seconds: float = 120
+    llm_max_retries: int = 3
+    llm_retry_base_delay_seconds: float = 0.5
+    llm_retry_max_delay_seconds: float = 8
+    llm_max_concurrency: int = 64
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+
+    # PDF storage and extraction
+    pdf_max_upload_bytes: int = 256 * 1024 * 1024
+    pdf_upload_chunk_bytes: int = 1024 * 1024
+    pdf_extraction_workers: int = 2
+    pdf_extraction_stale_after_seconds: int = 15 * 60
+    pdf_extraction_processes: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    pdf_parallel_page_threshold: int = 64
+    pdf_pages_per_chunk: int = 32
+    pdf_text_cache_max_entries: int = 256
+    pdf_text_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Retrieval, prompts and answers
+    retrieval_chunk_words: int = 200
+    retrieval_chunk_overlap_words: int = 40
+    retrieval_top_k: int = 8
+    retrieval_context_token_budget: int = 3000
+    retrieval_index_cache_entries: int = 64
+    prompt_token_budget: int = 6000
+    prompt_history_max_messages: int = 20
+    prompt_min_trimmed_tokens: int = 32
+    answer_cache_ttl_seconds: int = 24 * 60 * 60
+    answer_cache_max_entries: int = 10000
+    answer_cache_history_messages: int = 0
+
+    # Chat history
+    chat_history_write_mode: str = "batched"
+    chat_history_batch_size: int = 100
+    chat_history_flush_interval_seconds: float = 0.5
+    chat_history_max_pending: int = 10000
+    chat_history_max_retries: int = 3
+    chat_history_retry_base_delay_seconds: float = 0.5
+
+    # Chat admission control
+    admission_backend: str = "memory"  # "memory" or "mongo"
+    chat_requests_per_minute: int = 20
+    chat_tokens_per_minute: int = 60000
+    chat_max_in_flight: int = 32
+    chat_max_queued_per_user: int = 4
+    chat_queue_timeout_seconds: float = 10
+    admission_retry_after_seconds: int = 1
+    rate_limit_max_keys: int = 100000
+
+    # Server and observability
+    threadpool_size: int = 40
+    slow_request_threshold_ms: float = 2000
+    slow_request_log_path: str = "logs/slow_requests.log"
+    slow_request_log_max_bytes: int = 10 * 1024 * 1024
+    slow_request_log_backup_count: int = 5
+    profile_dir: str = "profiles"
+    trace_max_spans: int = 1000
+
+
+settings = Settings()
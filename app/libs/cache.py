@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded least-recently-used cache.
+
+    Entries are evicted oldest-first once either the entry count or the total weight
+    (as measured by the optional ``weigher``) exceeds its limit. Entries can also expire
+    after a time-to-live.
+    """
+
+    def __init__(self, max_entries: int, max_weight: Optional[int] = None,
+                 weigher: Optional[Callable[[Any], int]] = None, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Maximum number of entries kept in the cache.
+            max_weight: Maximum total weight of all entries (optional).
+            weigher: Callable returning the weight of a value (default: every value weighs 1).
+            ttl: Default number of seconds an entry stays valid (optional, default: no expiry).
+        """
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weigher = weigher or (lambda value: 1)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._weights: dict = {}
+        self._expiries: dict = {}
+        self._total_weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value for ``key`` and marks it as most recently used, or None on a miss.
+        """
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            expires_at = self._expiries.get(key)
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Stores ``value`` under ``key``, evicting the least recently used entries if needed.
+        Values heavier than ``max_weight`` on their own are not cached.
+
+        Args:
+            key: The cache key.
+            value: The value to store.
+            ttl: Seconds the entry stays valid, overriding the cache default (optional).
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        weight = self.weigher(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._data[key] = value
+            self._weights[key] = weight
+            self._total_weight += weight
+            if ttl is not None:
+                self._expiries[key] = time.monotonic() + ttl
+            while self._data and (
+                    len(self._data) > self.max_entries
+                    or (self.max_weight is not None and self._total_weight > self.max_weight)
+            ):
+                oldest_key = next(iter(self._data))
+                self._remove(oldest_key)
+
+    def pop(self, key: Hashable) -> None:
+        """Removes ``key`` from the cache if present."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self._expiries.clear()
+            self._total_weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: Hashable) -> None:
+        if key in self._data:
+            del self._data[key]
+            self._total_weight -= self._weights.pop(key)
+            self._expiries.pop(key, None)
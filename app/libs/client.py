@@ -1,24 +1,69 @@
-import os
-from openai import OpenAI
-from typing import List, Dict
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import List, Dict, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from app.config import settings
+from app.libs.metrics import register_pool, track_stage
+
+LLM_TIMEOUT_SECONDS = settings.llm_timeout_seconds
+LLM_CONNECT_TIMEOUT_SECONDS = settings.llm_connect_timeout_seconds
+LLM_DEADLINE_SECONDS = settings.llm_deadline_seconds
+LLM_MAX_RETRIES = settings.llm_max_retries
+LLM_RETRY_BASE_DELAY_SECONDS = settings.llm_retry_base_delay_seconds
+LLM_RETRY_MAX_DELAY_SECONDS = settings.llm_retry_max_delay_seconds
+LLM_MAX_CONCURRENCY = settings.llm_max_concurrency
+LLM_MAX_CONNECTIONS = settings.llm_max_connections
+LLM_MAX_KEEPALIVE_CONNECTIONS = settings.llm_max_keepalive_connections
+# Overridable to point the client at a compatible stand-in (e.g. the benchmark's fake server).
+GEMINI_BASE_URL = settings.gemini_base_url
+
+T = TypeVar("T")
 
 
 class GeminiClient:
     """
     Client wrapper for communicating with the Gemini API using OpenAI SDK-compatible interface.
+
+    One instance is shared by the whole process (see `get_llm_client`) so HTTP connections are
+    pooled. Every call is bounded by a deadline, retried with jittered exponential backoff on
+    429/5xx and connection errors, and admitted through a semaphore capping in-flight calls.
     """
 
-    def __init__(self):
-        api_key = os.environ.get("GEMINI_API_KEY")
+    def __init__(self, transport=None):
+        """
+        Args:
+            transport: The httpx transport of the pooled HTTP client (default: httpx's own; tests
+                pass an `httpx.MockTransport`).
+        """
+        api_key = settings.gemini_api_key
         if not api_key:
             raise EnvironmentError("GEMINI_API_KEY is not set in the environment variables.")
 
-        self.client = OpenAI(
+        # The OpenAI SDK is slow to import, so it is only loaded once a client is needed.
+        import httpx
+        from openai import AsyncOpenAI
+
+        timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+        self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+            base_url=GEMINI_BASE_URL,
+            timeout=timeout,
+            max_retries=0,  # Retries are handled by `_with_retries`
+            http_client=httpx.AsyncClient(
+                timeout=timeout,
+                transport=transport,
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
         )
+        self.semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        self.active = 0
+        self.waiting = 0
 
-    def chat(self, messages: List[Dict[str, str]], model: str = "gemini-2.0-flash") -> str:
+    async def chat(self, messages: List[Dict[str, str]], model: str = "gemini-2.0-flash") -> str:
         """
         Sends chat messages to the Gemini API and returns the assistant's response.
 
@@ -30,10 +75,141 @@ class GeminiClient:
             str: The assistant's response message.
         """
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages
-            )
+            async with self._slot():
+                with track_stage("llm_chat"):
+                    response = await self._with_retries(
+                        lambda timeout: self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            timeout=timeout
+                        )
+                    )
             return response.choices[0].message.content
         except Exception as e:
             raise RuntimeError(f"Gemini API call failed: {e}")
+
+    async def stream_chat(self, messages: List[Dict[str, str]], model: str = "gemini-2.0-flash") -> AsyncIterator[str]:
+        """
+        Sends chat messages to the Gemini API and yields the assistant's response as it is generated.
+        Closing the generator closes the underlying HTTP stream, which stops generation.
+
+        Args:
+            messages (List[Dict[str, str]]): The list of message dictionaries with roles and content.
+            model (str): The Gemini model to use (default: "gemini-2.0-flash").
+
+        Yields:
+            str: The next piece of the assistant's response.
+        """
+        async with self._slot():
+            with track_stage("llm_stream"):
+                try:
+                    stream = await self._with_retries(
+                        lambda timeout: self.client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            stream=True,
+                            timeout=timeout
+                        )
+                    )
+                except Exception as e:
+                    raise RuntimeError(f"Gemini API call failed: {e}")
+
+                async with stream:
+                    try:
+                        async for chunk in stream:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                yield chunk.choices[0].delta.content
+                    except Exception as e:
+                        raise RuntimeError(f"Gemini API stream failed: {e}")
+
+    async def close(self) -> None:
+        """Closes the pooled HTTP connections."""
+        await self.client.close()
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Holds one of the ``LLM_MAX_CONCURRENCY`` call slots, keeping the active and waiting counts."""
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    @staticmethod
+    async def _with_retries(call: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Runs ``call`` (which receives the timeout left for the attempt) until it succeeds, a
+        non-retryable error occurs, the retries are exhausted or the deadline has passed.
+        """
+        from openai import APIConnectionError, APIStatusError
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LLM_DEADLINE_SECONDS
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                return await call(min(remaining, LLM_TIMEOUT_SECONDS))
+            except (APIStatusError, APIConnectionError) as e:
+                if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                # Full jitter: sleep a random time up to the exponential backoff, or what the server asked for.
+                delay = _retry_after(e) or random.uniform(
+                    0, min(LLM_RETRY_MAX_DELAY_SECONDS, LLM_RETRY_BASE_DELAY_SECONDS * 2 ** attempt)
+                )
+                if loop.time() + delay >= deadline:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+def _is_retryable(error: Exception) -> bool:
+    from openai import APIStatusError
+
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return True
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    from openai import APIStatusError
+
+    if not isinstance(error, APIStatusError):
+        return None
+    try:
+        return min(float(error.response.headers.get("retry-after")), LLM_RETRY_MAX_DELAY_SECONDS)
+    except (TypeError, ValueError):
+        return None
+
+
+_llm_client: Optional[GeminiClient] = None
+
+
+def get_llm_client() -> GeminiClient:
+    """Returns the process-wide Gemini client, creating it on first use."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = GeminiClient()
+    return _llm_client
+
+
+register_pool(
+    "llm",
+    in_use=lambda: _llm_client.active if _llm_client else 0,
+    capacity=lambda: LLM_MAX_CONCURRENCY,
+    waiting=lambda: _llm_client.waiting if _llm_client else 0
+)
+
+
+async def close_llm_client() -> None:
+    """Closes the process-wide Gemini client if it was created."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.close()
+        _llm_client = None
@@ -32,6 +32,15 @@ class InvalidPDFFormatException(PDFException):
         """
         super().__init__(message, status_code=400)
 
+class PDFTooLargeException(PDFException):
+    """Exception raised when an uploaded PDF exceeds the maximum upload size."""
+    def __init__(self, message: str = "PDF file is too large."):
+        """
+        Args:
+            message: The error message.
+        """
+        super().__init__(message, status_code=413)
+
 class PDFParsingException(PDFException):
     """Exception raised when PDF parsing fails."""
     def __init__(self, message: str = "Failed to parse PDF."):
@@ -0,0 +1,154 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.libs.exceptions.pdf import InvalidPDFFormatException, PDFParsingException
+
+EXTRACTION_PROCESSES = settings.pdf_extraction_processes
+PARALLEL_PAGE_THRESHOLD = settings.pdf_parallel_page_threshold
+PAGES_PER_CHUNK = settings.pdf_pages_per_chunk
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process pool used for parallel extraction, creating it on first use.
+    Workers are spawned rather than forked so they never inherit database clients or locks.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=EXTRACTION_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Stops the extraction process pool if it was started."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a broken process pool (a worker died), so the next extraction starts a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[List[str], Optional[Tuple[int, str]]]:
+    """
+    Extracts the text of pages ``start`` to ``stop`` (exclusive) in a worker process.
+    The PDF is read from ``pdf_path`` so its bytes are not pickled into every task.
+
+    Returns:
+        The page texts extracted so far and, if a page failed, its index and error message.
+    """
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(pdf_path)
+    texts = []
+    for i in range(start, stop):
+        try:
+            texts.append(reader.pages[i].extract_text() or "")
+        except Exception as e:
+            return texts, (i, str(e))
+    return texts, None
+
+
+def extract_text(pdf_bytes: bytes, pdf_id_str: str, parallel_threshold: int = PARALLEL_PAGE_THRESHOLD,
+                 pages_per_chunk: int = PAGES_PER_CHUNK) -> str:
+    """
+    Extracts the text of every page of a PDF.
+
+    Documents with at least ``parallel_threshold`` pages are split into page ranges that are
+    extracted in parallel on the process pool; smaller documents are extracted serially.
+    Page texts are joined in page order.
+
+    Args:
+        pdf_bytes: The PDF content as bytes.
+        pdf_id_str: The GridFS ID of the PDF, used in error messages.
+        parallel_threshold: Minimum page count for parallel extraction.
+        pages_per_chunk: Number of pages extracted per worker task.
+
+    Returns:
+        The extracted text content as a string.
+
+    Raises:
+        PDFParsingException: If the PDF is unreadable, a page fails to parse or an extraction worker fails.
+    """
+    # PyPDF2 is imported on first use to keep it off the application's startup path.
+    from PyPDF2 import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        if not reader.pages:
+            raise InvalidPDFFormatException("PDF file does not contain any pages.")
+    except Exception as e:
+        raise PDFParsingException(f"Could not initialize PDF reader or file is unreadable (ID: {pdf_id_str}): {e}")
+
+    page_count = len(reader.pages)
+    if page_count < parallel_threshold or EXTRACTION_PROCESSES < 2:
+        texts = []
+        for i, page in enumerate(reader.pages):
+            try:
+                texts.append(page.extract_text() or "")
+            except Exception as e:
+                raise PDFParsingException(f"Error parsing page {i + 1} of PDF (ID: {pdf_id_str}): {e}")
+    else:
+        texts = _extract_in_parallel(pdf_bytes, pdf_id_str, page_count, pages_per_chunk)
+
+    return "".join(text + "\n" for text in texts if text)
+
+
+def _extract_in_parallel(pdf_bytes: bytes, pdf_id_str: str, page_count: int, pages_per_chunk: int) -> List[str]:
+    """
+    Extracts the page texts on the process pool. The PDF is written once to a temporary file that
+    every task reads, instead of being copied to the workers with each task.
+
+    Raises:
+        PDFParsingException: If a page fails to parse or a worker fails.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as pdf_file:
+        pdf_file.write(pdf_bytes)
+    pool = get_process_pool()
+    futures = []
+    texts: List[str] = []
+    try:
+        futures = [
+            pool.submit(_extract_page_range, pdf_file.name, start, min(start + pages_per_chunk, page_count))
+            for start in range(0, page_count, pages_per_chunk)
+        ]
+        for future in futures:
+            chunk_texts, error = future.result()
+            texts.extend(chunk_texts)
+            if error:
+                page_index, message = error
+                raise PDFParsingException(f"Error parsing page {page_index + 1} of PDF (ID: {pdf_id_str}): {message}")
+    except PDFParsingException:
+        raise
+    except BrokenProcessPool as e:
+        _discard_process_pool(pool)
+        raise PDFParsingException(f"PDF extraction worker died (ID: {pdf_id_str}): {e}")
+    except Exception as e:
+        raise PDFParsingException(f"PDF extraction failed (ID: {pdf_id_str}): {e}")
+    finally:
+        for future in futures:
+            future.cancel()
+        os.unlink(pdf_file.name)
+    return texts
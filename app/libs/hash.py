@@ -1,22 +1,25 @@
-import os
 from datetime import timedelta, datetime
 
 import jwt
-from dotenv import load_dotenv
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
+from app.libs.cache import LRUCache
+from app.libs.metrics import register_cache, track_stage
 from app.models.user import User
+from app.schemas.user import UserResponse
 from db import get_session
 
-load_dotenv()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-SECRET_KEY = os.environ.get("SECRET_KEY")
+SECRET_KEY = settings.secret_key
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 180
+USER_CACHE_MAX_ENTRIES = settings.user_cache_max_entries
+USER_CACHE_TTL_SECONDS = settings.user_cache_ttl_seconds
+# Comma-separated e-mails of the users allowed to use the /admin endpoints.
+ADMIN_EMAILS = {email.strip() for email in settings.admin_emails.split(",") if email.strip()}
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 credentials_exception = HTTPException(
@@ -25,13 +28,10 @@ credentials_exception = HTTPException(
     headers={"WWW-Authenticate": "Bearer"},
 )
 
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+# Snapshots (id, email) of authenticated users, keyed by email, so most requests skip the user lookup.
+# Hit/miss counts are available as `user_cache.hits` / `user_cache.misses`.
+user_cache = LRUCache(USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL_SECONDS)
+register_cache("user", user_cache)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -41,24 +41,44 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
 
+def invalidate_cached_user(email: str) -> None:
+    """Drops the cached snapshot of a user; call it whenever the user is changed or deleted."""
+    user_cache.pop(email)
 
-def get_current_user(
+
+async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_session)
-):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("user")
-        if email is None:
+        db: AsyncSession = Depends(get_session)
+) -> UserResponse:
+    with track_stage("auth"):
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("user")
+            if email is None:
+                raise credentials_exception
+        except jwt.PyJWTError:
+            raise credentials_exception
+
+        cached_user = user_cache.get(email)
+        if cached_user is not None:
+            return cached_user
+
+        with track_stage("user_lookup"):
+            user = await get_user_by_email(db, email)
+
+        if user is None:
             raise credentials_exception
-    except jwt.PyJWTError:
-        raise credentials_exception
+        snapshot = UserResponse(id=user.id, email=user.email)
+        user_cache.put(email, snapshot)
+        return snapshot
 
-    user = get_user_by_email(db, email)
 
-    if user is None:
-        raise credentials_exception
-    return user
+async def get_current_admin(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    if current_user.email not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
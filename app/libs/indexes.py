@@ -0,0 +1,160 @@
+"""
+Declarative registry of the database indexes the application relies on.
+
+Indexes are applied idempotently by the migrate step (see `app.migrate`). Run
+``python -m app.libs.indexes check`` to report missing indexes and the queries
+that MongoDB still answers with a collection scan.
+"""
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from sqlalchemy import Index, inspect
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models.chat import ChatHistory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MongoIndex:
+    """A MongoDB index on one collection."""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return options
+
+
+@dataclass(frozen=True)
+class QueryProbe:
+    """A representative query whose plan is checked by `check_indexes`."""
+    collection: str
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, int]] = field(default_factory=list)
+
+
+MONGO_INDEXES: List[MongoIndex] = [
+    MongoIndex("pdf_metadata", (("user_id", ASCENDING), ("gridfs_id", ASCENDING)), "user_id_gridfs_id"),
+    MongoIndex("pdf_metadata", (("user_id", ASCENDING), ("content_hash", ASCENDING)), "user_id_content_hash"),
+    MongoIndex("pdf_metadata", (("gridfs_id", ASCENDING),), "gridfs_id"),
+    MongoIndex("pdf_metadata", (("user_id", ASCENDING), ("upload_date", ASCENDING), ("_id", ASCENDING)),
+               "user_id_upload_date_id"),
+    MongoIndex("user_pdf_parser", (("user_id", ASCENDING), ("source_pdf_id", ASCENDING)), "user_id_source_pdf_id"),
+    MongoIndex("user_pdf_selection", (("user_id", ASCENDING),), "user_id"),
+    # Removes expired answers; documents expire at the time stored in `expires_at`.
+    MongoIndex("answer_cache", (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0),
+    # Removes the rate limit buckets that are full again (used by ADMISSION_BACKEND=mongo).
+    MongoIndex("rate_limits", (("expires_at", ASCENDING),), "expires_at_ttl", expire_after_seconds=0),
+]
+
+POSTGRES_INDEXES: List[Index] = sorted(ChatHistory.__table__.indexes, key=lambda index: index.name)
+
+QUERY_PROBES: List[QueryProbe] = [
+    QueryProbe("pdf_metadata", {"user_id": 0, "gridfs_id": ""}),
+    QueryProbe("pdf_metadata", {"user_id": 0, "content_hash": ""}),
+    QueryProbe("pdf_metadata", {"gridfs_id": ""}),
+    QueryProbe("pdf_metadata", {"user_id": 0}, [("upload_date", ASCENDING), ("_id", ASCENDING)]),
+    QueryProbe("user_pdf_parser", {"user_id": 0, "source_pdf_id": ""}),
+    QueryProbe("user_pdf_selection", {"user_id": 0, "selected_pdf_id": {"$ne": None}}),
+]
+
+
+async def apply_indexes(mongo_db: AsyncIOMotorDatabase, engine: AsyncEngine) -> None:
+    """
+    Creates every registered index that does not exist yet. Safe to run on every startup.
+    An index conflicting with an existing one (same keys, different name or options) is logged and skipped.
+
+    Args:
+        mongo_db: The MongoDB database holding the PDF collections.
+        engine: The PostgreSQL engine.
+    """
+    for index in MONGO_INDEXES:
+        try:
+            await mongo_db[index.collection].create_index(list(index.keys), **index.options())
+        except OperationFailure as e:
+            logger.warning(f"Could not create index {index.name} on {index.collection}: {e}")
+
+    async with engine.begin() as conn:
+        for index in POSTGRES_INDEXES:
+            await conn.run_sync(lambda sync_conn, idx=index: idx.create(sync_conn, checkfirst=True))
+
+
+async def check_indexes(mongo_db: AsyncIOMotorDatabase, engine: AsyncEngine) -> List[str]:
+    """
+    Returns a list of problems: registered indexes that are missing, and probe queries
+    whose winning plan in MongoDB is still a collection scan.
+
+    Args:
+        mongo_db: The MongoDB database holding the PDF collections.
+        engine: The PostgreSQL engine.
+    """
+    problems = []
+    for index in MONGO_INDEXES:
+        existing = await mongo_db[index.collection].index_information()
+        if not any(info["key"] == list(index.keys) for info in existing.values()):
+            problems.append(f"mongo: missing index {index.name} on {index.collection} {list(index.keys)}")
+
+    async with engine.connect() as conn:
+        existing_names = await conn.run_sync(
+            lambda sync_conn: {idx["name"] for idx in inspect(sync_conn).get_indexes(ChatHistory.__tablename__)}
+        )
+    for index in POSTGRES_INDEXES:
+        if index.name not in existing_names:
+            problems.append(f"postgres: missing index {index.name} on {index.table.name}")
+
+    for probe in QUERY_PROBES:
+        cursor = mongo_db[probe.collection].find(probe.filter)
+        if probe.sort:
+            cursor = cursor.sort(probe.sort)
+        plan = await cursor.explain()
+        if _has_stage(plan.get("queryPlanner", {}).get("winningPlan", {}), "COLLSCAN"):
+            problems.append(f"mongo: COLLSCAN on {probe.collection} for {probe.filter}")
+    return problems
+
+
+def _has_stage(plan: Dict[str, Any], stage: str) -> bool:
+    if plan.get("stage") == stage:
+        return True
+    children = [plan.get("inputStage"), plan.get("queryPlan"), *plan.get("inputStages", [])]
+    return any(_has_stage(child, stage) for child in children if child)
+
+
+async def _main(command: str) -> int:
+    from db import close_databases, get_engine, get_mongo_db
+
+    try:
+        if command == "apply":
+            await apply_indexes(get_mongo_db(), get_engine())
+            print("Indexes applied.")
+            return 0
+
+        problems = await check_indexes(get_mongo_db(), get_engine())
+        for problem in problems:
+            print(problem)
+        if not problems:
+            print("All indexes present; no collection scans.")
+        return 1 if problems else 0
+    finally:
+        await close_databases()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in ("apply", "check"):
+        print("Usage: python -m app.libs.indexes [apply|check]")
+        sys.exit(2)
+    sys.exit(asyncio.run(_main(sys.argv[1])))
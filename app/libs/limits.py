@@ -0,0 +1,65 @@
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies larger than ``max_bytes`` with a 413 before the
+    application reads them, so an oversized upload is not spooled to disk first.
+
+    A request declaring a larger ``Content-Length`` is rejected without reading its body; a body
+    sent without one (chunked) is counted as it is received and cut off with an `HTTPException`
+    once it goes over.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: Iterable[str]):
+        """
+        Args:
+            app: The ASGI application.
+            max_bytes: Maximum size of a request body, in bytes.
+            paths: The request paths the limit applies to.
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI turns other errors raised while it parses the body into a 400.
+                    raise HTTPException(status_code=413, detail=self._detail, headers={"Connection": "close"})
+            return message
+
+        await self.app(scope, counting_receive, send)
+
+    async def _reject(self, scope, receive, send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": self._detail},
+            headers={"Connection": "close"}
+        )
+        await response(scope, receive, send)
+
+    @property
+    def _detail(self) -> str:
+        return f"Request body exceeds the maximum size of {self.max_bytes} bytes."
@@ -0,0 +1,153 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from prometheus_client import Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.libs.tracing import current_route, match_route, span
+
+_LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_SECONDS = Histogram(
+    "pdfchat_http_request_seconds", "Time spent serving HTTP requests, including streamed bodies.",
+    ["route", "method", "status"], buckets=_LATENCY_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    "pdfchat_stage_seconds", "Time spent in each stage of request processing.",
+    ["stage", "route", "outcome"], buckets=_LATENCY_BUCKETS
+)
+ERRORS = Counter("pdfchat_errors", "Exceptions raised by request processing stages.", ["stage", "route", "error"])
+CHAT_HISTORY_WRITE_ERRORS = Counter("pdfchat_chat_history_write_errors", "Failed chat history batch inserts.")
+CHAT_HISTORY_DROPPED_MESSAGES = Counter(
+    "pdfchat_chat_history_dropped_messages", "Chat history messages dropped after their batch kept failing."
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "pdfchat_password_hash_seconds", "Running time of bcrypt jobs on the password hasher, excluding the queue wait.",
+    ["operation"], buckets=_LATENCY_BUCKETS
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "pdfchat_password_hash_rejected", "Password hashing jobs rejected because too many were pending."
+)
+RATE_LIMITED = Counter("pdfchat_rate_limited", "Chat requests rejected by admission control.", ["reason"])
+LLM_TOKENS = Counter("pdfchat_llm_tokens", "Estimated tokens sent to and received from the model.", ["kind"])
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    Records the duration of a block in `pdfchat_stage_seconds`, labeled by the current route and by
+    outcome ("ok" or "error"), and as a span of the request's trace. Exceptions are counted in
+    `pdfchat_errors` and re-raised.
+
+    Args:
+        stage: Name of the stage (e.g. "gridfs_read").
+    """
+    started_at = time.perf_counter()
+    route = current_route.get()
+    try:
+        with span(stage):
+            yield
+    except BaseException as e:
+        STAGE_SECONDS.labels(stage, route, "error").observe(time.perf_counter() - started_at)
+        ERRORS.labels(stage, route, type(e).__name__).inc()
+        raise
+    STAGE_SECONDS.labels(stage, route, "ok").observe(time.perf_counter() - started_at)
+
+
+class _RuntimeCollector:
+    """Reads cache counters and pool utilization from the live objects at scrape time."""
+
+    def __init__(self):
+        self.caches: Dict[str, Any] = {}
+        self.pools: Dict[str, Dict[str, Optional[Callable[[], float]]]] = {}
+
+    def collect(self):
+        hits = CounterMetricFamily("pdfchat_cache_hits", "Cache lookups that found a value.", labels=["cache"])
+        misses = CounterMetricFamily("pdfchat_cache_misses", "Cache lookups that found nothing.", labels=["cache"])
+        for name, cache in self.caches.items():
+            hits.add_metric([name], cache.hits)
+            misses.add_metric([name], cache.misses)
+
+        gauges = {
+            "in_use": GaugeMetricFamily("pdfchat_pool_in_use", "Pool slots currently in use.", labels=["pool"]),
+            "capacity": GaugeMetricFamily("pdfchat_pool_capacity", "Pool slots available in total.", labels=["pool"]),
+            "waiting": GaugeMetricFamily("pdfchat_pool_waiting", "Work items waiting for a pool slot.", labels=["pool"]),
+        }
+        for name, readers in self.pools.items():
+            for field, reader in readers.items():
+                if reader is None:
+                    continue
+                try:
+                    value = reader()
+                except Exception:
+                    # e.g. the threadpool gauges, which can only be read from the event loop.
+                    continue
+                gauges[field].add_metric([name], value)
+        return [hits, misses, *gauges.values()]
+
+
+_runtime_collector = _RuntimeCollector()
+REGISTRY.register(_runtime_collector)
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """
+    Exposes the ``hits`` and ``misses`` counters of a cache as `pdfchat_cache_hits{cache=name}`
+    and `pdfchat_cache_misses{cache=name}`.
+    """
+    _runtime_collector.caches[name] = cache
+
+
+def register_pool(name: str, in_use: Callable[[], float], capacity: Optional[Callable[[], float]] = None,
+                  waiting: Optional[Callable[[], float]] = None) -> None:
+    """
+    Exposes the utilization of a worker pool, connection pool or queue. The callables are read at
+    scrape time and must be cheap and non-blocking.
+
+    Args:
+        name: The pool label.
+        in_use: Returns the number of slots in use.
+        capacity: Returns the total number of slots (optional).
+        waiting: Returns the number of work items waiting for a slot (optional).
+    """
+    _runtime_collector.pools[name] = {"in_use": in_use, "capacity": capacity, "waiting": waiting}
+
+
+def render_latest() -> bytes:
+    """Returns every metric in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency of every HTTP request in `pdfchat_http_request_seconds`.
+
+    The matched route template (not the raw path, which would make the label unbounded) is stored
+    in `current_route` for the duration of the request so stages can be labeled with it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = match_route(scope)
+        token = current_route.set(route)
+        status: List[int] = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_SECONDS.labels(route, scope["method"], str(status[0])).observe(time.perf_counter() - started_at)
+            current_route.reset(token)
+
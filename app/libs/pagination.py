@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+
+class InvalidCursorException(ValueError):
+    """Exception raised when a continuation token cannot be decoded."""
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encodes the sort key of the last item of a page as an opaque continuation token.
+
+    Args:
+        position: The sort key fields of the last item. Datetimes are preserved.
+
+    Returns:
+        A URL-safe token to pass back as `cursor` to fetch the next page.
+    """
+    payload = {
+        key: {"$dt": value.isoformat()} if isinstance(value, datetime) else value
+        for key, value in position.items()
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """
+    Decodes a continuation token produced by `encode_cursor`.
+
+    Args:
+        token: The continuation token.
+
+    Returns:
+        The sort key fields of the last item of the previous page.
+
+    Raises:
+        InvalidCursorException: If the token is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict):
+            raise ValueError("cursor payload is not an object")
+        return {
+            key: datetime.fromisoformat(value["$dt"]) if isinstance(value, dict) and "$dt" in value else value
+            for key, value in payload.items()
+        }
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorException(f"Invalid cursor: {token}") from e
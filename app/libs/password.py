@@ -0,0 +1,150 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
+
+from app.config import settings
+from app.libs.metrics import PASSWORD_HASH_REJECTED, PASSWORD_HASH_SECONDS, register_pool
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# "thread" or "process". Processes sidestep the GIL for the few bcrypt steps that hold it, at the cost of spawning.
+PASSWORD_HASH_EXECUTOR = settings.password_hash_executor.lower()
+PASSWORD_HASH_WORKERS = settings.password_hash_workers
+PASSWORD_HASH_MAX_PENDING = settings.password_hash_max_pending
+PASSWORD_HASH_RETRY_AFTER_SECONDS = settings.password_hash_retry_after_seconds
+# Raising the cost makes existing hashes "deprecated"; they are rehashed on the next successful login.
+BCRYPT_ROUNDS = settings.bcrypt_rounds
+
+_pwd_context: Optional["CryptContext"] = None
+
+
+def get_pwd_context() -> "CryptContext":
+    """Returns the bcrypt context, importing passlib on first use (also in hasher worker processes)."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifies a password and returns a new hash if the stored one uses outdated parameters."""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    """Runs a job on the executor and returns its result with its running time (excluding the queue wait)."""
+    started_at = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started_at
+
+
+class PasswordHasherBusyException(Exception):
+    """Exception raised when too many password hashing jobs are already pending."""
+    def __init__(self, retry_after: int = PASSWORD_HASH_RETRY_AFTER_SECONDS):
+        """
+        Args:
+            retry_after: Number of seconds the client should wait before retrying.
+        """
+        self.retry_after = retry_after
+        super().__init__("Too many password hashing requests in progress.")
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a dedicated, bounded executor.
+
+    Keeping the CPU-heavy bcrypt jobs off the shared threadpool means a burst of logins cannot
+    starve other work. Jobs beyond ``max_pending`` (running plus queued) are rejected right away
+    with `PasswordHasherBusyException` instead of piling up. The running time of the jobs is
+    recorded in `pdfchat_password_hash_seconds` and rejections in `pdfchat_password_hash_rejected`.
+    """
+
+    def __init__(self, kind: str = PASSWORD_HASH_EXECUTOR, max_workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        """
+        Args:
+            kind: "thread" or "process".
+            max_workers: Number of jobs running at once.
+            max_pending: Maximum number of running and queued jobs.
+        """
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def hash(self, password: str) -> str:
+        """Returns the hash of a password."""
+        return await self._run("hash", hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verifies a password against its stored hash.
+
+        Returns:
+            Whether the password matches, and a replacement hash if the stored one should be upgraded.
+        """
+        return await self._run("verify", verify_and_update_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stops the executor."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _run(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusyException()
+
+        self.pending += 1
+        try:
+            result, seconds = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, *args)
+        finally:
+            self.pending -= 1
+        PASSWORD_HASH_SECONDS.labels(operation).observe(seconds)
+        return result
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Returns the process-wide password hasher, creating it on first use."""
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is None:
+            _password_hasher = PasswordHasher()
+        return _password_hasher
+
+
+register_pool(
+    "password_hasher",
+    in_use=lambda: min(_password_hasher.pending, PASSWORD_HASH_WORKERS) if _password_hasher else 0,
+    capacity=lambda: PASSWORD_HASH_WORKERS,
+    waiting=lambda: max(_password_hasher.pending - PASSWORD_HASH_WORKERS, 0) if _password_hasher else 0
+)
+
+
+def shutdown_password_hasher() -> None:
+    """Stops the process-wide password hasher if it was created."""
+    global _password_hasher
+    with _password_hasher_lock:
+        if _password_hasher is not None:
+            _password_hasher.shutdown()
+            _password_hasher = None
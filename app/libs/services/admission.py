@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Optional
+
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.libs.cache import LRUCache
+from app.libs.metrics import RATE_LIMITED, register_pool
+
+logger = logging.getLogger(__name__)
+
+# "memory" keeps the buckets in each worker process; "mongo" shares them between workers.
+ADMISSION_BACKEND = settings.admission_backend.lower()
+CHAT_REQUESTS_PER_MINUTE = settings.chat_requests_per_minute
+CHAT_TOKENS_PER_MINUTE = settings.chat_tokens_per_minute
+CHAT_MAX_IN_FLIGHT = settings.chat_max_in_flight
+CHAT_MAX_QUEUED_PER_USER = settings.chat_max_queued_per_user
+CHAT_QUEUE_TIMEOUT_SECONDS = settings.chat_queue_timeout_seconds
+ADMISSION_RETRY_AFTER_SECONDS = settings.admission_retry_after_seconds
+RATE_LIMIT_MAX_KEYS = settings.rate_limit_max_keys
+
+
+class RateLimitExceededException(Exception):
+    """Raised when a request is not admitted; the client should retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: float = ADMISSION_RETRY_AFTER_SECONDS):
+        """
+        Args:
+            reason: What rejected the request ("requests", "tokens", "queue_full" or "queue_timeout").
+            retry_after: Number of seconds the client should wait before retrying (rounded up).
+        """
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"Too many chat requests ({reason}), retry in {self.retry_after} seconds.")
+
+
+class InMemoryRateLimitBackend:
+    """
+    Keeps the state of the buckets in the process. Each bucket is a single timestamp, the time at
+    which it will be full again (GCRA), so an idle bucket needs no entry: entries expire once
+    their bucket is full and the least recently used are evicted beyond ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self._full_at = LRUCache(max_keys)
+
+    async def consume(self, key: str, cost: float, interval: float, tolerance: float, force: bool = False) -> float:
+        now = time.time()
+        full_at = max(self._full_at.get(key) or now, now)
+        new_full_at = full_at + cost * interval
+        retry_after = new_full_at - now - tolerance
+        if retry_after > 0 and not force:
+            return retry_after
+        if new_full_at > now:
+            self._full_at.put(key, new_full_at, ttl=new_full_at - now)
+        return 0.0
+
+
+class MongoRateLimitBackend:
+    """
+    Keeps the state of the buckets in a MongoDB collection shared by every worker. Each check is a
+    single atomic update of the bucket's document; documents are removed by a TTL index once
+    their bucket is full.
+    """
+
+    def __init__(self, collection):
+        """
+        Args:
+            collection: The MongoDB collection holding one document per bucket.
+        """
+        self.collection = collection
+
+    async def consume(self, key: str, cost: float, interval: float, tolerance: float, force: bool = False) -> float:
+        now = time.time()
+        full_at = {"$max": [{"$ifNull": ["$full_at", now]}, now]}
+        new_full_at = {"$add": [full_at, cost * interval]}
+        next_full_at = {"$cond": [{"$or": [force, {"$lte": [new_full_at, now + tolerance]}]}, new_full_at, full_at]}
+        # The previous state is returned so the decision the server made can be replayed here.
+        previous = await self.collection.find_one_and_update(
+            {"_id": key},
+            [{"$set": {"full_at": next_full_at, "expires_at": {"$toDate": {"$multiply": [next_full_at, 1000]}}}}],
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        full_at = max((previous or {}).get("full_at", now), now)
+        retry_after = full_at + cost * interval - now - tolerance
+        return 0.0 if force or retry_after <= 0 else retry_after
+
+
+class FairQueue:
+    """
+    Caps the requests in flight in this process and hands free slots to the waiting users in
+    turn, so a user with many queued requests only delays their own. A user's requests beyond
+    ``max_queued_per_user`` are rejected at once, and a request waiting more than ``timeout``
+    seconds is rejected too.
+    """
+
+    def __init__(self, capacity: int = CHAT_MAX_IN_FLIGHT, max_queued_per_user: int = CHAT_MAX_QUEUED_PER_USER,
+                 timeout: float = CHAT_QUEUE_TIMEOUT_SECONDS):
+        """
+        Args:
+            capacity: Maximum number of requests in flight.
+            max_queued_per_user: Maximum number of waiting requests per user.
+            timeout: Maximum number of seconds a request waits for a slot.
+        """
+        self.capacity = capacity
+        self.max_queued_per_user = max_queued_per_user
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    @asynccontextmanager
+    async def slot(self, user_id: int) -> AsyncIterator[None]:
+        """
+        Holds a slot for the enclosed block, waiting for the user's turn if none is free.
+
+        Raises:
+            RateLimitExceededException: If the user's queue is full or the wait times out.
+        """
+        await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, user_id: int) -> None:
+        """
+        Takes a slot, waiting for the user's turn if none is free. Every slot taken must be given
+        back with `release`; prefer `slot` when the work fits in one block.
+
+        Raises:
+            RateLimitExceededException: If the user's queue is full or the wait times out.
+        """
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiters = self._waiters.setdefault(user_id, deque())
+        if len(waiters) >= self.max_queued_per_user:
+            if not waiters:
+                del self._waiters[user_id]
+            raise RateLimitExceededException("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            # Shielded so a timeout does not cancel a slot handed over at the same moment.
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._remove(user_id, waiter)
+                raise RateLimitExceededException("queue_timeout")
+        except BaseException:
+            if waiter.done():
+                self.release()
+            else:
+                self._remove(user_id, waiter)
+            raise
+
+    def release(self) -> None:
+        """Gives back a slot taken with `acquire`."""
+        # The slot passes to the oldest waiter of the next user in turn, so `in_flight` is unchanged.
+        if not self._waiters:
+            self.in_flight -= 1
+            return
+        user_id, waiters = next(iter(self._waiters.items()))
+        waiter = waiters.popleft()
+        if waiters:
+            self._waiters.move_to_end(user_id)
+        else:
+            del self._waiters[user_id]
+        waiter.set_result(None)
+
+    def _remove(self, user_id: int, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        waiters = self._waiters.get(user_id)
+        if waiters is not None:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiters[user_id]
+
+
+class AdmissionController:
+    """
+    Admission control in front of the model calls of `ChatService`.
+
+    Every user has two token buckets refilled continuously: chat requests per minute and
+    estimated prompt tokens per minute. A request is admitted if a request is left and the
+    tokens are not overdrawn; the prompt's tokens are charged once it is built, so a large
+    prompt can overdraw the bucket and delays the user's next requests instead of failing
+    this one. Admitted requests then wait for a slot of the `FairQueue`.
+
+    The buckets are kept by a pluggable backend (in-process, or a MongoDB collection shared by
+    the workers); the in-flight cap applies per worker process. If the backend fails, requests
+    are admitted and the failure is logged.
+    """
+
+    def __init__(self, backend, requests_per_minute: int = CHAT_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = CHAT_TOKENS_PER_MINUTE, queue: Optional[FairQueue] = None):
+        """
+        Args:
+            backend: The state of the buckets (`InMemoryRateLimitBackend` or `MongoRateLimitBackend`).
+            requests_per_minute: Chat requests a user can make per minute (also the burst size).
+            tokens_per_minute: Estimated prompt tokens a user can send per minute (also the burst size).
+            queue: The in-flight cap and its queue (default: a `FairQueue` with the configured limits).
+        """
+        self.backend = backend
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.queue = queue or FairQueue()
+
+    async def check(self, user_id: int) -> None:
+        """
+        Takes a request from the user's bucket.
+
+        Raises:
+            RateLimitExceededException: If the user is out of requests or has overdrawn their tokens.
+        """
+        retry_after = await self._consume(f"requests:{user_id}", 1, self.requests_per_minute)
+        if retry_after > 0:
+            RATE_LIMITED.labels("requests").inc()
+            raise RateLimitExceededException("requests", retry_after)
+        retry_after = await self._consume(f"tokens:{user_id}", 0, self.tokens_per_minute)
+        if retry_after > 0:
+            RATE_LIMITED.labels("tokens").inc()
+            raise RateLimitExceededException("tokens", retry_after)
+
+    async def charge_tokens(self, user_id: int, tokens: int) -> None:
+        """Takes the estimated prompt tokens of an admitted request from the user's bucket."""
+        await self._consume(f"tokens:{user_id}", tokens, self.tokens_per_minute, force=True)
+
+    @asynccontextmanager
+    async def slot(self, user_id: int) -> AsyncIterator[None]:
+        """
+        Holds one of the process's in-flight slots for the enclosed block.
+
+        Raises:
+            RateLimitExceededException: If the user's queue is full or the wait times out.
+        """
+        try:
+            async with self.queue.slot(user_id):
+                yield
+        except RateLimitExceededException as e:
+            RATE_LIMITED.labels(e.reason).inc()
+            raise
+
+    async def acquire_slot(self, user_id: int) -> Callable[[], None]:
+        """
+        Takes one of the process's in-flight slots for work that outlives the caller's block (a
+        streamed response), and returns the function giving it back. Calling it again does nothing.
+
+        Raises:
+            RateLimitExceededException: If the user's queue is full or the wait times out.
+        """
+        try:
+            await self.queue.acquire(user_id)
+        except RateLimitExceededException as e:
+            RATE_LIMITED.labels(e.reason).inc()
+            raise
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.queue.release()
+
+        return release
+
+    async def _consume(self, key: str, cost: float, per_minute: int, force: bool = False) -> float:
+        # A bucket of `per_minute` units refilled at one unit every `interval` seconds: it is
+        # empty once it is full again no sooner than 60 seconds from now.
+        interval = 60 / per_minute
+        try:
+            return await self.backend.consume(key, cost, interval, 60, force=force)
+        except Exception as e:
+            logger.warning(f"Rate limit backend failed for {key}, admitting the request: {e}")
+            return 0.0
+
+
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Returns the process-wide admission controller, creating it on first use."""
+    global _admission_controller
+    if _admission_controller is None:
+        if ADMISSION_BACKEND == "mongo":
+            from db import get_mongo_db
+            backend = MongoRateLimitBackend(get_mongo_db()["rate_limits"])
+        else:
+            backend = InMemoryRateLimitBackend()
+        _admission_controller = AdmissionController(backend)
+    return _admission_controller
+
+
+def close_admission_controller() -> None:
+    """Drops the process-wide admission controller, so it is recreated on the next MongoDB client."""
+    global _admission_controller
+    _admission_controller = None
+
+
+register_pool(
+    "chat_admission",
+    in_use=lambda: _admission_controller.queue.in_flight if _admission_controller else 0,
+    capacity=lambda: CHAT_MAX_IN_FLIGHT,
+    waiting=lambda: _admission_controller.queue.waiting if _admission_controller else 0
+)
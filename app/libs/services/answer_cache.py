@@ -0,0 +1,125 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.config import settings
+from app.libs.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_TTL_SECONDS = settings.answer_cache_ttl_seconds
+ANSWER_CACHE_MAX_ENTRIES = settings.answer_cache_max_entries
+# Previous messages included in the answer key. With none, a question gets the same answer in every
+# conversation about the document; each message included makes the key depend on the conversation.
+ANSWER_CACHE_HISTORY_MESSAGES = settings.answer_cache_history_messages
+
+
+def normalize_question(question: str) -> str:
+    """Normalizes a question so trivially different phrasings share a cache entry."""
+    return " ".join(question.lower().split()).strip(" ?!.")
+
+
+def make_answer_key(content_hash: str, question: str, model: str, prompt_version: str,
+                    conversation: Sequence[Tuple[str, str]] = ()) -> str:
+    """
+    Returns the cache key of an answer.
+
+    The key covers the document, the normalized question, the model and the prompt version, plus
+    the last ``ANSWER_CACHE_HISTORY_MESSAGES`` messages of the conversation (none by default, so a
+    repeated question hits the cache in any conversation, at the cost of reusing an answer to a
+    follow-up question whose meaning depended on the earlier messages).
+
+    Args:
+        content_hash: The content hash of the PDF the question is about.
+        question: The user's question (normalized by this function).
+        model: The name of the model producing the answer.
+        prompt_version: The version of the prompt assembly producing the answer.
+        conversation: The previous messages to key on, oldest first, as (role, message) pairs.
+    """
+    parts = [content_hash, normalize_question(question), model, prompt_version]
+    parts.extend(f"{role}:{message}" for role, message in conversation)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """
+    Cache of model answers to questions about a document, with a TTL.
+
+    A size-bounded in-process LRU tier sits in front of a persistent MongoDB tier
+    (expired documents are removed by a TTL index on `expires_at`).
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: int = ANSWER_CACHE_TTL_SECONDS):
+        """
+        Args:
+            collection: The MongoDB collection backing the persistent tier.
+            max_entries: Maximum number of answers kept in memory.
+            ttl: Number of seconds an answer stays valid.
+        """
+        self.collection = collection
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        """Returns the cached answer for a key, or None if there is no valid entry."""
+        answer = self.memory.get(key)
+        if answer is None:
+            answer = await self._get_persisted(key)
+
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    async def put(self, key: str, answer: str, content_hash: str, model: str, prompt_version: str) -> None:
+        """Stores an answer in both tiers. Persistent tier failures are logged, not raised."""
+        self.memory.put(key, answer)
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "answer": answer,
+                    "content_hash": content_hash,
+                    "model": model,
+                    "prompt_version": prompt_version,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist cached answer {key}: {e}")
+
+    async def invalidate(self, key: str) -> None:
+        """Removes a key from both tiers."""
+        self.memory.pop(key)
+        try:
+            await self.collection.delete_one({"_id": key})
+        except Exception as e:
+            logger.warning(f"Could not invalidate cached answer {key}: {e}")
+
+    async def _get_persisted(self, key: str) -> Optional[str]:
+        now = datetime.now(timezone.utc)
+        try:
+            doc = await self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": now}}, {"answer": 1, "expires_at": 1}
+            )
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed for {key}: {e}")
+            return None
+        if not doc:
+            return None
+
+        expires_at = doc["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self.memory.put(key, doc["answer"], ttl=(expires_at - now).total_seconds())
+        return doc["answer"]
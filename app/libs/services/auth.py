@@ -1,8 +1,10 @@
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.libs.hash import hash_password, verify_password, create_access_token
+from app.libs.hash import create_access_token, get_user_by_email, invalidate_cached_user
+from app.libs.metrics import track_stage
+from app.libs.password import get_password_hasher, PasswordHasherBusyException
 from app.models.user import User
 from app.schemas.user import LoginRequest, TokenResponse
 
@@ -13,14 +15,14 @@ class AuthService:
 
     Methods
     -------
-    register_user(user: LoginRequest, session: Session) -> User
+    register_user(user: LoginRequest, session: AsyncSession) -> User
         Registers a new user with hashed password, raises HTTPException if email exists.
 
-    login_user(request: LoginRequest, session: Session) -> TokenResponse
+    login_user(request: LoginRequest, session: AsyncSession) -> TokenResponse
         Authenticates user and returns JWT token, raises HTTPException if credentials invalid.
     """
 
-    def register_user(self, user: LoginRequest, session: Session) -> User:
+    async def register_user(self, user: LoginRequest, session: AsyncSession) -> User:
         """
         Register a new user with the provided credentials.
 
@@ -28,8 +30,8 @@ class AuthService:
         ----------
         user : LoginRequest
             User credentials including email and password.
-        session : Session
-            SQLAlchemy database session.
+        session : AsyncSession
+            SQLAlchemy async database session.
 
         Returns
         -------
@@ -39,29 +41,32 @@ class AuthService:
         Raises
         ------
         HTTPException
-            If the email is already registered (status code 400).
+            If the email is already registered (status code 400), or too many passwords are
+            being hashed (status code 503).
         """
+        hashed_password = await self._run_hasher(get_password_hasher().hash(user.password))
         try:
-            hashed_password = hash_password(user.password)
             new_user = User(email=user.email, password=hashed_password)
             session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
+            await session.commit()
+            await session.refresh(new_user)
+            invalidate_cached_user(new_user.email)
             return new_user
         except IntegrityError:
-            session.rollback()
+            await session.rollback()
             raise HTTPException(status_code=400, detail="Email already registered")
 
-    def login_user(self, request: LoginRequest, session: Session) -> TokenResponse:
+    async def login_user(self, request: LoginRequest, session: AsyncSession) -> TokenResponse:
         """
         Authenticate a user and create a JWT token if credentials are valid.
+        Password hashes made with outdated parameters are upgraded on a successful login.
 
         Parameters
         ----------
         request : LoginRequest
             User login request containing email and password.
-        session : Session
-            SQLAlchemy database session.
+        session : AsyncSession
+            SQLAlchemy async database session.
 
         Returns
         -------
@@ -71,11 +76,43 @@ class AuthService:
         Raises
         ------
         HTTPException
-            If email or password is incorrect (status code 401).
+            If email or password is incorrect (status code 401), or too many passwords are
+            being verified (status code 503).
         """
-        user = session.query(User).filter(User.email == request.email).first()
-        if not user or not verify_password(request.password, user.password):
+        user = await get_user_by_email(session, request.email)
+        if not user:
             raise HTTPException(status_code=401, detail="E-Mail or Password is incorrect.")
 
+        verified, new_hash = await self._run_hasher(
+            get_password_hasher().verify_and_update(request.password, user.password)
+        )
+        if not verified:
+            raise HTTPException(status_code=401, detail="E-Mail or Password is incorrect.")
+        if new_hash:
+            user.password = new_hash
+            await session.commit()
+
         token = create_access_token({"user": str(user.email)})
         return TokenResponse(access_token=token)
+
+    @staticmethod
+    async def _run_hasher(job):
+        """
+        Awaits a password hasher job, turning a full hasher queue into a 503 response.
+
+        Parameters
+        ----------
+        job : Awaitable
+            The hasher coroutine.
+
+        Raises
+        ------
+        HTTPException
+            If the hasher queue is full (status code 503, with a Retry-After header).
+        """
+        try:
+            with track_stage("password_hash"):
+                return await job
+        except PasswordHasherBusyException as e:
+            raise HTTPException(status_code=503, detail="Server busy, please retry.",
+                                headers={"Retry-After": str(e.retry_after)})
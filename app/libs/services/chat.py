@@ -1,24 +1,208 @@
-from sqlalchemy.orm import Session
+import asyncio
+import logging
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from datetime import datetime
-from typing import List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.config import settings
+from app.libs.metrics import CHAT_HISTORY_DROPPED_MESSAGES, CHAT_HISTORY_WRITE_ERRORS, register_pool, track_stage
+from app.libs.pagination import decode_cursor, encode_cursor, InvalidCursorException
+from app.libs.tracing import detach_from_request
 from app.models.chat import MessageDirection, ChatHistory
 
+logger = logging.getLogger(__name__)
+
+# "batched" buffers messages in a write-behind writer; "sync" inserts each message in its own transaction.
+CHAT_HISTORY_WRITE_MODE = settings.chat_history_write_mode.lower()
+CHAT_HISTORY_BATCH_SIZE = settings.chat_history_batch_size
+CHAT_HISTORY_FLUSH_INTERVAL_SECONDS = settings.chat_history_flush_interval_seconds
+CHAT_HISTORY_MAX_PENDING = settings.chat_history_max_pending
+CHAT_HISTORY_MAX_RETRIES = settings.chat_history_max_retries
+CHAT_HISTORY_RETRY_BASE_DELAY_SECONDS = settings.chat_history_retry_base_delay_seconds
+
+
+class ChatHistoryWriter:
+    """
+    Write-behind writer for chat history messages.
+
+    Messages are buffered in a bounded queue and inserted by a background task as one multi-row
+    INSERT per batch, once ``batch_size`` messages are pending or ``flush_interval`` seconds have
+    passed since the first one. When the queue is full, `write` waits for room (backpressure).
+    Messages not written yet are returned by `pending`, so readers can merge them with the database.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker, batch_size: int = CHAT_HISTORY_BATCH_SIZE,
+                 flush_interval: float = CHAT_HISTORY_FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = CHAT_HISTORY_MAX_PENDING, max_retries: int = CHAT_HISTORY_MAX_RETRIES,
+                 retry_base_delay: float = CHAT_HISTORY_RETRY_BASE_DELAY_SECONDS):
+        """
+        Args:
+            session_maker: Factory of the sessions used to insert batches.
+            batch_size: Number of messages that triggers a flush.
+            flush_interval: Maximum number of seconds a message waits in the buffer.
+            max_pending: Maximum number of buffered messages before `write` blocks.
+            max_retries: Number of times a failed batch insert is retried before the batch is dropped.
+            retry_base_delay: Seconds before the first retry; the delay doubles on every retry.
+        """
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        # Rows accepted by `write` until their batch is written (or dropped), in write order.
+        self._unflushed: Dict[int, Dict[str, Any]] = {}
+
+    async def write(self, row: Dict[str, Any]) -> None:
+        """Buffers a chat history row, waiting for room if the buffer is full."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await self._queue.put(row)
+        self._unflushed[id(row)] = row
+
+    def pending(self, user_id: int, pdf_hash: Optional[str] = None,
+                before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Returns the user's buffered rows that are not in the database yet, oldest first."""
+        return [
+            row for row in self._unflushed.values()
+            if row["user_id"] == user_id
+            and (not pdf_hash or row["pdf_hash"] == pdf_hash)
+            and (before is None or row["created_at"] < before)
+        ]
+
+    async def flush(self) -> None:
+        """Inserts every buffered message now."""
+        while not self._queue.empty():
+            await self._insert(self._drain(self.batch_size))
+
+    async def close(self) -> None:
+        """Stops the background task and flushes the remaining messages."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        # Started by the first request that writes a message, but flushes on behalf of every request.
+        detach_from_request()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    batch.extend(self._drain(self.batch_size - len(batch)))
+                    remaining = deadline - loop.time()
+                    if len(batch) >= self.batch_size or remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Messages already taken off the queue are written before the task stops.
+                await self._insert(batch)
+                raise
+            # Shielded so cancelling the task (on close) does not abort a batch being written.
+            await asyncio.shield(self._insert(batch))
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Inserts a batch, retrying transient failures with exponential backoff. Meanwhile the queue
+        fills up and `write` applies backpressure. A batch still failing after ``max_retries``
+        retries is dropped and counted in `pdfchat_chat_history_dropped_messages`.
+        """
+        if not rows:
+            return
+        async with self._flush_lock:
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        with track_stage("chat_history_flush"):
+                            async with self.session_maker() as session:
+                                await session.execute(insert(ChatHistory), rows)
+                                await session.commit()
+                        return
+                    except Exception as e:
+                        CHAT_HISTORY_WRITE_ERRORS.inc()
+                        if attempt == self.max_retries:
+                            CHAT_HISTORY_DROPPED_MESSAGES.inc(len(rows))
+                            logger.exception(f"Dropped {len(rows)} chat history messages after {attempt + 1} attempts")
+                            return
+                        delay = self.retry_base_delay * 2 ** attempt
+                        logger.warning(f"Could not write {len(rows)} chat history messages, retrying in {delay}s: {e}")
+                        await asyncio.sleep(delay)
+            finally:
+                for row in rows:
+                    self._unflushed.pop(id(row), None)
+
+
+_chat_history_writer: Optional[ChatHistoryWriter] = None
+
+
+def get_chat_history_writer() -> Optional[ChatHistoryWriter]:
+    """Returns the process-wide chat history writer, or None in sync write mode."""
+    global _chat_history_writer
+    if CHAT_HISTORY_WRITE_MODE == "sync":
+        return None
+    if _chat_history_writer is None:
+        from db import get_session_maker
+        _chat_history_writer = ChatHistoryWriter(get_session_maker())
+    return _chat_history_writer
+
+
+register_pool(
+    "chat_history_writer",
+    in_use=lambda: _chat_history_writer._queue.qsize() if _chat_history_writer else 0,
+    capacity=lambda: CHAT_HISTORY_MAX_PENDING
+)
+
+
+async def close_chat_history_writer() -> None:
+    """Flushes and stops the process-wide chat history writer if it was created."""
+    global _chat_history_writer
+    if _chat_history_writer is not None:
+        await _chat_history_writer.close()
+        _chat_history_writer = None
+
 
 class ChatHistoryService:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: AsyncSession, writer: Optional[ChatHistoryWriter] = None):
         """
         Service for handling chat history operations in PostgreSQL.
+
+        Args:
+            db_session (AsyncSession): The session used for reads and synchronous writes.
+            writer (ChatHistoryWriter, optional): Write-behind writer buffering saved messages.
+                Without one, every message is inserted in its own transaction.
         """
         self.db = db_session
+        self.writer = writer
 
-    def save_message(
+    async def save_message(
         self,
         user_id: int,
         message: str,
         direction: MessageDirection,
-        pdf_hash: Optional[str] = None
-    ) -> ChatHistory:
+        pdf_hash: Optional[str] = None,
+        sync: bool = False
+    ) -> Optional[ChatHistory]:
         """
         Saves a chat message to the database.
 
@@ -27,38 +211,112 @@ class ChatHistoryService:
             message (str): Message content.
             direction (MessageDirection): Direction of the message (user/assistant).
             pdf_hash (str, optional): Hash of the associated PDF.
+            sync (bool): Insert the message now even if a writer is configured.
 
         Returns:
-            ChatHistory: The created chat history record.
+            Optional[ChatHistory]: The created chat history record, or None if the message was
+            buffered by the writer (it has no ID until the writer flushes it).
         """
-        chat_entry = ChatHistory(
-            user_id=user_id,
-            message=message,
-            direction=direction,
-            pdf_hash=pdf_hash,
-            created_at=datetime.utcnow()
-        )
-        self.db.add(chat_entry)
-        self.db.commit()
-        self.db.refresh(chat_entry)
-        return chat_entry
+        row = {
+            "user_id": user_id,
+            "message": message,
+            "direction": direction,
+            "pdf_hash": pdf_hash,
+            "created_at": datetime.utcnow()
+        }
+        with track_stage("save_message"):
+            if self.writer is not None and not sync:
+                await self.writer.write(row)
+                return None
 
+            chat_entry = ChatHistory(**row)
+            self.db.add(chat_entry)
+            await self.db.commit()
+            await self.db.refresh(chat_entry)
+            return chat_entry
 
-    def get_conversation(self, user_id: int, pdf_hash: Optional[str] = None, limit: int = 20) -> list[
-        Type[ChatHistory]]:
+    async def get_conversation(self, user_id: int, pdf_hash: Optional[str] = None,
+                               limit: int = 20, before: Optional[datetime] = None) -> List[ChatHistory]:
         """
-        Returns the last N chat messages for the user.
+        Returns the last N chat messages for the user, newest first, including the messages still
+        buffered by the writer (those have no ID).
 
         Args:
             user_id (int): ID of the user.
             pdf_hash (str, optional): Filter by specific PDF.
             limit (int): Number of messages to return.
+            before (datetime, optional): Only return messages created before this time.
 
         Returns:
             List[ChatHistory]: List of recent chat history records.
         """
-        query = self.db.query(ChatHistory).filter(ChatHistory.user_id == user_id)
+        # Read before the database, so a row written in between is found in one or the other.
+        pending = self.writer.pending(user_id, pdf_hash, before) if self.writer is not None else []
+
+        query = select(ChatHistory).where(ChatHistory.user_id == user_id)
         if pdf_hash:
-            query = query.filter(ChatHistory.pdf_hash == pdf_hash)
+            query = query.where(ChatHistory.pdf_hash == pdf_hash)
+        if before:
+            query = query.where(ChatHistory.created_at < before)
+
+        result = await self.db.execute(query.order_by(ChatHistory.created_at.desc()).limit(limit))
+        entries = list(result.scalars().all())
+        if not pending:
+            return entries
+
+        stored = {(entry.created_at, entry.direction, entry.message) for entry in entries}
+        entries.extend(
+            ChatHistory(**row) for row in pending
+            if (row["created_at"], row["direction"], row["message"]) not in stored
+        )
+        entries.sort(key=lambda entry: entry.created_at, reverse=True)
+        return entries[:limit]
+
+    async def get_history_page(self, user_id: int, pdf_hash: Optional[str] = None, limit: int = 50,
+                               cursor: Optional[str] = None) -> Tuple[List[Row], Optional[str]]:
+        """
+        Returns one page of the user's chat history, newest first.
+
+        Pages are delimited by keyset on (created_at, id) rather than by offset, so every page is a
+        single range scan of the (user_id[, pdf_hash], created_at, id) index however deep the client pages.
+        Only the columns of the response are selected.
+
+        Args:
+            user_id (int): ID of the user.
+            pdf_hash (str, optional): Filter by specific PDF.
+            limit (int): Maximum number of messages in the page.
+            cursor (str, optional): Continuation token returned with the previous page.
+
+        Returns:
+            Tuple[List[Row], Optional[str]]: The messages of the page, and the token of the next page
+            (None on the last page).
+
+        Raises:
+            InvalidCursorException: If the cursor is malformed.
+        """
+        query = select(
+            ChatHistory.id,
+            ChatHistory.message,
+            ChatHistory.direction,
+            ChatHistory.created_at,
+            ChatHistory.pdf_hash
+        ).where(ChatHistory.user_id == user_id)
+        if pdf_hash:
+            query = query.where(ChatHistory.pdf_hash == pdf_hash)
+        if cursor:
+            position = decode_cursor(cursor)
+            if not isinstance(position.get("created_at"), datetime) or not isinstance(position.get("id"), int):
+                raise InvalidCursorException(f"Invalid cursor: {cursor}")
+            query = query.where(
+                tuple_(ChatHistory.created_at, ChatHistory.id) < tuple_(position["created_at"], position["id"])
+            )
+
+        # One extra row tells whether there is a next page.
+        query = query.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc()).limit(limit + 1)
+        rows = list((await self.db.execute(query)).all())
 
-        return query.order_by(ChatHistory.created_at.desc()).limit(limit).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"created_at": rows[-1].created_at, "id": rows[-1].id})
+        return rows, next_cursor
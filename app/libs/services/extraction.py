@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.config import settings
+from app.libs.tracing import detach_from_request
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = settings.pdf_extraction_workers
+# A queued or running job of another process not updated for this long is assumed lost (e.g. by a restart).
+EXTRACTION_STALE_AFTER_SECONDS = settings.pdf_extraction_stale_after_seconds
+
+
+class JobState(str, Enum):
+    NOT_STARTED = "not_started"
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExtractionPipeline:
+    """
+    Runs PDF text extraction jobs in the background, off the request path.
+
+    Jobs are asyncio tasks keyed by the content hash of the PDF, so concurrent requests for the
+    same content share one in-flight job. At most ``max_workers`` jobs run at once, and their
+    CPU-bound work is pushed to a dedicated thread pool so the event loop never blocks. The state
+    and timings of every job are persisted in MongoDB so they can be reported by the status endpoint,
+    with the process owning the job, so jobs lost with their process can be found and run again.
+    """
+
+    def __init__(self, jobs_collection: AsyncIOMotorCollection, max_workers: int = EXTRACTION_WORKERS,
+                 stale_after: float = EXTRACTION_STALE_AFTER_SECONDS):
+        """
+        Args:
+            jobs_collection: The MongoDB collection storing job states.
+            max_workers: Number of jobs (and worker threads) running at once.
+            stale_after: Seconds after which a queued or running job of another process is assumed lost.
+        """
+        self.jobs_collection = jobs_collection
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-extraction")
+        self._slots = asyncio.Semaphore(max_workers)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._running = 0
+
+    def submit(self, job_id: str, func: Callable[[], Awaitable[Any]], **job_fields: Any) -> asyncio.Task:
+        """
+        Queues ``func`` as the extraction job ``job_id``. If a job with the same ID is
+        already queued or running, its task is returned instead of starting a new one.
+
+        Args:
+            job_id: The job identifier (the content hash of the PDF).
+            func: The coroutine function performing the extraction.
+            **job_fields: Extra fields stored on the job document.
+
+        Returns:
+            The task running the job. Await it through `wait` so a cancelled request does not cancel the job.
+        """
+        task = self._in_flight.get(job_id)
+        if task is not None:
+            return task
+
+        task = asyncio.create_task(self._run(job_id, func, job_fields))
+        self._in_flight[job_id] = task
+        task.add_done_callback(lambda done: self._forget(job_id, done))
+        return task
+
+    @staticmethod
+    async def wait(task: asyncio.Task) -> Any:
+        """Waits for a job's result without cancelling the job if the waiter is cancelled."""
+        return await asyncio.shield(task)
+
+    def get_in_flight(self, job_id: str) -> Optional[asyncio.Task]:
+        """Returns the task of a queued or running job, or None if there is none."""
+        return self._in_flight.get(job_id)
+
+    async def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the persisted job document, or None if the job was never submitted."""
+        return await self.jobs_collection.find_one({"_id": job_id})
+
+    def is_orphaned(self, job: Dict[str, Any]) -> bool:
+        """
+        Returns whether a persisted job is queued or running without a live task: it belongs to this
+        process but is not in flight, or its process has not updated it for ``stale_after`` seconds.
+        """
+        if job.get("state") not in (JobState.QUEUED.value, JobState.RUNNING.value) or job["_id"] in self._in_flight:
+            return False
+        if job.get("owner") == self.owner:
+            return True
+        updated_at = job.get("started_at") or job.get("queued_at")
+        if updated_at is None:
+            return True
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - updated_at).total_seconds() > self.stale_after
+
+    async def claim(self, job: Dict[str, Any]) -> bool:
+        """
+        Takes over an orphaned job, marking it queued by this process. The update only applies if the
+        job is unchanged, so a single process wins and resubmits it.
+        """
+        result = await self.jobs_collection.update_one(
+            {"_id": job["_id"], "state": job["state"], "owner": job.get("owner")},
+            {"$set": {"state": JobState.QUEUED.value, "owner": self.owner, "queued_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count == 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the number of running and queued jobs."""
+        return {"running": self._running, "queued": len(self._in_flight) - self._running}
+
+    async def run_in_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs CPU-bound work on the extraction thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def shutdown(self) -> None:
+        """Waits for queued and running jobs to finish and stops the worker pool."""
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _run(self, job_id: str, func: Callable[[], Awaitable[Any]], job_fields: Dict[str, Any]) -> Any:
+        # Started by the request that submitted the job, but outlives it and is shared by later requests.
+        detach_from_request()
+        queued_at = time.perf_counter()
+        await self._update_job(job_id, {
+            **job_fields,
+            "owner": self.owner,
+            "state": JobState.QUEUED.value,
+            "queued_at": datetime.now(timezone.utc),
+            "started_at": None,
+            "finished_at": None,
+            "queue_ms": None,
+            "duration_ms": None,
+            "error": None
+        })
+
+        async with self._slots:
+            started_at = time.perf_counter()
+            await self._update_job(job_id, {
+                "state": JobState.RUNNING.value,
+                "started_at": datetime.now(timezone.utc),
+                "queue_ms": round((started_at - queued_at) * 1000, 2)
+            })
+            self._running += 1
+            try:
+                result = await func()
+            except Exception as e:
+                await self._update_job(job_id, {
+                    "state": JobState.FAILED.value,
+                    "finished_at": datetime.now(timezone.utc),
+                    "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+                    "error": getattr(e, "message", str(e))
+                })
+                raise
+            finally:
+                self._running -= 1
+
+        await self._update_job(job_id, {
+            "state": JobState.DONE.value,
+            "finished_at": datetime.now(timezone.utc),
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 2)
+        })
+        return result
+
+    def _forget(self, job_id: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(job_id) is task:
+            del self._in_flight[job_id]
+        # Failures are recorded on the job document; retrieving the exception keeps asyncio from logging it again.
+        if not task.cancelled():
+            task.exception()
+
+    async def _update_job(self, job_id: str, fields: Dict[str, Any]) -> None:
+        try:
+            await self.jobs_collection.update_one({"_id": job_id}, {"$set": fields}, upsert=True)
+        except Exception as e:
+            logger.warning(f"Could not update extraction job {job_id}: {e}")
@@ -1,89 +1,252 @@
-from typing import List, Dict
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Dict, AsyncIterator, Any, List, Optional, Tuple
 
-from fastapi import Depends
+from app.config import settings
+from app.libs.client import get_llm_client
+from app.libs.metrics import LLM_TOKENS, register_cache, track_stage
+from app.libs.services.admission import RateLimitExceededException, get_admission_controller
+from app.libs.services.answer_cache import ANSWER_CACHE_HISTORY_MESSAGES, AnswerCache, make_answer_key
+from app.libs.services.chat import ChatHistoryService, get_chat_history_writer
+from app.libs.services.loader import PDFRequestLoader
+from app.libs.services.prompt import Prompt, PromptBuilder, PROMPT_HISTORY_MAX_MESSAGES, estimate_tokens
+from app.libs.services.retrieval import CONTEXT_TOKEN_BUDGET
+from app.models.chat import ChatHistory, MessageDirection
+from app.routers.pdf import get_pdf_service
+from db import get_mongo_db
 
-from app.libs.client import GeminiClient
-from app.libs.services.chat import ChatHistoryService
-from app.libs.services.pdf import PDFService
-from app.models.chat import MessageDirection
-from app.routers.pdf import get_pdf_service, db
-from db import get_session
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = settings.gemini_model
+# Part of the answer cache key: bump it whenever the prompt assembly changes so stale answers are not reused.
+PROMPT_VERSION = "2"
+
+prompt_builder = PromptBuilder()
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Returns the process-wide answer cache, creating it on first use."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(get_mongo_db()["answer_cache"])
+        register_cache("answer", _answer_cache)
+    return _answer_cache
+
+
+def close_answer_cache() -> None:
+    """Drops the process-wide answer cache, so it is recreated on the next MongoDB client."""
+    global _answer_cache
+    _answer_cache = None
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Formats a Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 class ChatService:
-    def __init__(self, db_session):
-        self.llm_client = GeminiClient()
-        self.chat_service =  ChatHistoryService(db_session)
+    def __init__(self, db_session, pdf_loader: Optional[PDFRequestLoader] = None):
+        self.llm_client = get_llm_client()
+        self.admission = get_admission_controller()
+        self.pdf_loader = pdf_loader or PDFRequestLoader(get_pdf_service())
+        self.chat_service = ChatHistoryService(db_session, writer=get_chat_history_writer())
+
+    async def get_history(self, user_id: int, pdf_hash: str, asked_at: datetime) -> List[ChatHistory]:
+        """Returns the recent conversation about a PDF that precedes a message, newest first."""
+        with track_stage("history_lookup"):
+            return await self.chat_service.get_conversation(
+                user_id, pdf_hash, limit=PROMPT_HISTORY_MAX_MESSAGES, before=asked_at
+            )
 
-    def build_messages(self, user_id: int, current_user_message: str, pdf_id: str) -> List[Dict[str, str]]:
+    async def build_messages(self, user_id: int, current_user_message: str, pdf_id: str,
+                             history: List[ChatHistory]) -> Prompt:
         """
-        Builds the message list to send to the Gemini model, including context from the selected PDF
-        and the most recent user message if available.
+        Builds the message list to send to the Gemini model within the prompt token budget: the system
+        prompt, the recent conversation about the PDF, the chunks of the selected PDF most relevant to
+        the current user message and the message itself. The oldest turns are trimmed or dropped first.
 
         Args:
             user_id (int): The ID of the user.
             current_user_message (str): The current message from the user.
-            pdf_id (int): The ID of the selected PDF document.
+            pdf_id (str): The ID of the selected PDF document.
+            history (List[ChatHistory]): The previous messages of the conversation, newest first.
 
         Returns:
-            List[Dict[str, str]]: A list of messages with roles and content for the model.
+            Prompt: The messages with roles and content for the model, and their estimated token count.
         """
-        messages = []
-
-        # System role defines the behavior of the model
-        system_message = {
-            "role": "system",
-            "content": (
-                "You are an AI assistant that helps users by answering questions based on a selected PDF document. "
-                "Respond concisely and helpfully, and only use PDF content. If unsure, admit it."
-            )
-        }
-        messages.append(system_message)
-
-
-        # Add the parsed PDF content as context
-        pdf_context = get_pdf_service().get_full_text(pdf_id, user_id)
-        messages.append({
-            "role": "user",
-            "content": f"The content of the PDF is: {pdf_context}"
-        })
-
-        messages.append({"role": "user", "content": current_user_message})
-
-        return messages
-
-    def send_chat(self, user_id: int, current_user_message: str, pdf_id: str) -> str:
+        chunk_index = await self.pdf_loader.get_chunk_index(pdf_id, user_id)
+        with track_stage("prompt_build"):
+            prompt = prompt_builder.build(current_user_message, chunk_index, history, CONTEXT_TOKEN_BUDGET)
+        logger.info(f"Prompt for user {user_id}: ~{prompt.token_estimate} tokens, "
+                    f"{prompt.history_messages} history messages")
+        return prompt
+
+    async def send_chat(self, user_id: int, current_user_message: str, pdf_id: str, use_cache: bool = True,
+                        refresh_cache: bool = False) -> Tuple[str, Optional[int]]:
         """
         Sends a message to the Gemini model and returns the assistant's response.
-        Stores the user and assistant messages in the conversation history.
+        Stores the user and assistant messages in the conversation history, tagged with the
+        content hash of the PDF. Answers to questions already asked about the same content are served
+        from the answer cache (and still recorded in the history).
+        The request waits for an in-flight slot of the admission controller, and the prompt's
+        estimated tokens are charged to the user's token bucket.
 
         Args:
             user_id (int): The ID of the user.
             current_user_message (str): The current message from the user.
             pdf_id (int): The ID of the selected PDF document.
+            use_cache (bool): Whether to read and write the answer cache.
+            refresh_cache (bool): Whether to ignore and overwrite the cached answer.
 
         Returns:
-            str: The response generated by the assistant.
+            Tuple[str, Optional[int]]: The response generated by the assistant, and the estimated
+            number of prompt tokens sent to the model (None if the answer came from the cache).
 
         Raises:
+            RateLimitExceededException: If the user's queue is full or the wait for a slot times out.
             RuntimeError: If an error occurs during message processing or model response.
         """
         try:
-            self.chat_service.save_message(
-                user_id=user_id,
-                message=current_user_message,
-                direction=MessageDirection.OUTGOING,
-                pdf_hash=pdf_id
-            )
-            messages = self.build_messages(user_id, current_user_message, pdf_id)
-            response = self.llm_client.chat(messages)
-            self.chat_service.save_message(
+            async with self.admission.slot(user_id):
+                pdf_hash, asked_at = await self._start_chat(user_id, current_user_message, pdf_id)
+                history = await self.get_history(user_id, pdf_hash, asked_at)
+                cache_key = self._answer_key(pdf_hash, current_user_message, history)
+
+                prompt_tokens = None
+                response = await self._get_cached_answer(cache_key, use_cache, refresh_cache)
+                if response is None:
+                    prompt = await self.build_messages(user_id, current_user_message, pdf_id, history)
+                    prompt_tokens = prompt.token_estimate
+                    await self.admission.charge_tokens(user_id, prompt_tokens)
+                    response = await self.llm_client.chat(prompt.messages, model=CHAT_MODEL)
+                    LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+                    LLM_TOKENS.labels("completion").inc(estimate_tokens(response))
+                    if use_cache:
+                        await get_answer_cache().put(cache_key, response, pdf_hash, CHAT_MODEL, PROMPT_VERSION)
+
+                await self.chat_service.save_message(
+                    user_id=user_id,
+                    message=response,
+                    direction=MessageDirection.INCOMING,
+                    pdf_hash=pdf_hash
+                )
+
+                return response, prompt_tokens
+        except RateLimitExceededException:
+            raise
+        except Exception as e:
+            raise RuntimeError("An error occurred while processing your message.") from e
+
+    async def stream_chat(self, user_id: int, current_user_message: str, pdf_id: str, use_cache: bool = True,
+                          refresh_cache: bool = False) -> AsyncIterator[str]:
+        """
+        Streams the Gemini model's response to a message as Server-Sent Events.
+
+        A `token` event is emitted for every piece of the response as it arrives, followed by a
+        `done` event carrying the full answer (and the estimated prompt token count) once it has been
+        stored in the conversation history.
+        A cached answer is sent as a single `token` event. Failures are reported with an `error`
+        event. If the client disconnects, the model stream is closed and the partial answer is not stored.
+        The caller holds the in-flight slot (see `AdmissionController.acquire_slot`), so that a
+        rejection is answered with a 429 before the response starts.
+
+        Args:
+            user_id (int): The ID of the user.
+            current_user_message (str): The current message from the user.
+            pdf_id (str): The ID of the selected PDF document.
+            use_cache (bool): Whether to read and write the answer cache.
+            refresh_cache (bool): Whether to ignore and overwrite the cached answer.
+
+        Yields:
+            str: Formatted SSE messages.
+        """
+        try:
+            pdf_hash, asked_at = await self._start_chat(user_id, current_user_message, pdf_id)
+            history = await self.get_history(user_id, pdf_hash, asked_at)
+            cache_key = self._answer_key(pdf_hash, current_user_message, history)
+            response = await self._get_cached_answer(cache_key, use_cache, refresh_cache)
+            prompt = None
+            if response is None:
+                prompt = await self.build_messages(user_id, current_user_message, pdf_id, history)
+                await self.admission.charge_tokens(user_id, prompt.token_estimate)
+        except Exception:
+            logger.exception(f"Could not prepare chat stream for user {user_id}")
+            yield format_sse("error", {"detail": "An error occurred while processing your message."})
+            return
+
+        if response is not None:
+            yield format_sse("token", {"delta": response})
+        else:
+            parts = []
+            deltas = self.llm_client.stream_chat(prompt.messages, model=CHAT_MODEL)
+            try:
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield format_sse("token", {"delta": delta})
+            except (GeneratorExit, asyncio.CancelledError):
+                logger.info(f"Chat stream for user {user_id} aborted by the client after {len(parts)} tokens")
+                raise
+            except Exception:
+                logger.exception(f"Chat stream for user {user_id} failed")
+                yield format_sse("error", {"detail": "An error occurred while processing your message."})
+                return
+            finally:
+                await deltas.aclose()
+            response = "".join(parts)
+            LLM_TOKENS.labels("prompt").inc(prompt.token_estimate)
+            LLM_TOKENS.labels("completion").inc(estimate_tokens(response))
+
+        try:
+            if use_cache and prompt is not None:
+                await get_answer_cache().put(cache_key, response, pdf_hash, CHAT_MODEL, PROMPT_VERSION)
+            await self.chat_service.save_message(
                 user_id=user_id,
                 message=response,
                 direction=MessageDirection.INCOMING,
-                pdf_hash=pdf_id
+                pdf_hash=pdf_hash
             )
+        except Exception:
+            logger.exception(f"Could not store streamed answer for user {user_id}")
+            yield format_sse("error", {"detail": "The answer could not be saved."})
+            return
+
+        yield format_sse("done", {
+            "message": response,
+            "prompt_tokens": prompt.token_estimate if prompt is not None else None
+        })
 
-            return response
-        except Exception as e:
-            raise RuntimeError("An error occurred while processing your message.") from e
+    async def _start_chat(self, user_id: int, current_user_message: str, pdf_id: str) -> Tuple[str, datetime]:
+        """
+        Stores the user's message in the conversation history.
+
+        Returns:
+            The content hash of the PDF, and the time the message was received.
+        """
+        asked_at = datetime.utcnow()
+        pdf_hash = await self.pdf_loader.get_content_hash(pdf_id, user_id)
+        await self.chat_service.save_message(
+            user_id=user_id,
+            message=current_user_message,
+            direction=MessageDirection.OUTGOING,
+            pdf_hash=pdf_hash
+        )
+        return pdf_hash, asked_at
+
+    @staticmethod
+    def _answer_key(pdf_hash: str, current_user_message: str, history: List[ChatHistory]) -> str:
+        """Returns the answer cache key of a message, covering its last ``ANSWER_CACHE_HISTORY_MESSAGES`` messages."""
+        recent = history[:ANSWER_CACHE_HISTORY_MESSAGES] if ANSWER_CACHE_HISTORY_MESSAGES > 0 else []
+        conversation = [(entry.direction.value, entry.message) for entry in reversed(recent)]
+        return make_answer_key(pdf_hash, current_user_message, CHAT_MODEL, PROMPT_VERSION, conversation)
+
+    @staticmethod
+    async def _get_cached_answer(cache_key: str, use_cache: bool, refresh_cache: bool) -> Optional[str]:
+        """Returns the cached answer for a key, unless the cache is bypassed or being refreshed."""
+        if not use_cache or refresh_cache:
+            return None
+        with track_stage("answer_cache_lookup"):
+            return await get_answer_cache().get(cache_key)
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Optional, Tuple
+
+from app.libs.services.pdf import PDFService
+from app.libs.services.retrieval import ChunkIndex
+
+
+class PDFRequestLoader:
+    """
+    Request-scoped loader for the PDF data needed by the chat path.
+
+    Memoizes the user's selection, content hashes, chunk indexes and texts for the life of a
+    request, on top of the request-scoped `PDFService` (which memoizes metadata documents), so
+    each piece of data is fetched from MongoDB at most once per request. Create one per request.
+    """
+
+    def __init__(self, pdf_service: PDFService):
+        """
+        Args:
+            pdf_service: The request-scoped PDF service.
+        """
+        self.pdf_service = pdf_service
+        self._selections: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._content_hashes: Dict[Tuple[str, int], str] = {}
+        self._chunk_indexes: Dict[Tuple[str, int], ChunkIndex] = {}
+        self._texts: Dict[Tuple[str, int], str] = {}
+
+    async def get_selection(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the user's selected PDF (without its text), or None if there is none."""
+        if user_id not in self._selections:
+            self._selections[user_id] = await self.pdf_service.get_selected_pdf_for_user(user_id)
+        return self._selections[user_id]
+
+    async def get_content_hash(self, pdf_id_str: str, user_id: int) -> str:
+        """Returns the content hash of a user's PDF."""
+        key = (pdf_id_str, user_id)
+        if key not in self._content_hashes:
+            self._content_hashes[key] = await self.pdf_service.get_content_hash(pdf_id_str, user_id)
+        return self._content_hashes[key]
+
+    async def get_chunk_index(self, pdf_id_str: str, user_id: int) -> ChunkIndex:
+        """Returns the retrieval index of a user's PDF."""
+        key = (pdf_id_str, user_id)
+        if key not in self._chunk_indexes:
+            self._chunk_indexes[key] = await self.pdf_service.get_chunk_index(pdf_id_str, user_id)
+        return self._chunk_indexes[key]
+
+    async def get_full_text(self, pdf_id_str: str, user_id: int) -> str:
+        """Returns the extracted text of a user's PDF."""
+        key = (pdf_id_str, user_id)
+        if key not in self._texts:
+            self._texts[key] = await self.pdf_service.get_full_text(pdf_id_str, user_id)
+        return self._texts[key]
@@ -1,114 +1,301 @@
-import io
+import asyncio
+import hashlib
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-from PyPDF2 import PdfReader
 from bson import ObjectId
-from gridfs import GridFS
 from gridfs.errors import NoFile
-from pymongo.database import Database
-from pymongo.collection import Collection
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from fastapi import UploadFile
 
+from app.config import settings
 from app.libs.exceptions.pdf import InvalidPDFFormatException, DatabaseOperationException, PDFNotFoundException, \
-    PDFParsingException, NoTextExtractedException
+    NoTextExtractedException, PDFException, PDFTooLargeException
+from app.libs.extractor import extract_text
+from app.libs.metrics import track_stage
+from app.libs.pagination import decode_cursor, encode_cursor, InvalidCursorException
+from app.libs.services.extraction import ExtractionPipeline, JobState
+from app.libs.services.retrieval import ChunkIndex, ChunkIndexStore
+from app.libs.services.text_cache import TextCache, compute_content_hash
+
+MAX_UPLOAD_BYTES = settings.pdf_max_upload_bytes
+UPLOAD_CHUNK_BYTES = settings.pdf_upload_chunk_bytes
 
 
 class PDFService:
     """
     Service class for handling PDF-related business logic.
     This includes uploading, listing, parsing, and selecting PDFs.
+
+    All database access goes through Motor, and CPU-bound work (extraction, indexing, hashing)
+    runs on the extraction pipeline's executor, so no method blocks the event loop.
+
+    Instances are request-scoped (see `get_pdf_service`): metadata documents are memoized for
+    the life of the instance, so a request validates and reads each PDF's metadata only once.
     """
 
-    def __init__(self, db: Database, fs: GridFS):
+    def __init__(self, db: AsyncIOMotorDatabase, text_cache: TextCache, chunk_index_store: ChunkIndexStore,
+                 extraction_pipeline: ExtractionPipeline):
         """
         Initializes the PDFService.
 
         Args:
-            db: A PyMongo Database instance.
-            fs: A GridFS instance.
+            db: A Motor Database instance.
+            text_cache: The content-addressed cache for extracted text.
+            chunk_index_store: The store of retrieval indexes built from the extracted text.
+            extraction_pipeline: The worker pool running background extraction jobs.
         """
         self.db = db
-        self.fs = fs
-        self.metadata_collection: Collection = db.pdf_metadata
-        self.user_pdf_parser_collection: Collection = db.user_pdf_parser
-        self.user_pdf_selection_collection: Collection = db.user_pdf_selection
+        self.bucket = AsyncIOMotorGridFSBucket(db)
+        self.text_cache = text_cache
+        self.chunk_index_store = chunk_index_store
+        self.extraction_pipeline = extraction_pipeline
+        self.metadata_collection: AsyncIOMotorCollection = db.pdf_metadata
+        self.blob_collection: AsyncIOMotorCollection = db.pdf_blobs
+        self.user_pdf_parser_collection: AsyncIOMotorCollection = db.user_pdf_parser
+        self.user_pdf_selection_collection: AsyncIOMotorCollection = db.user_pdf_selection
+        self._pdf_docs: Dict[Tuple[str, int], Dict[str, Any]] = {}
 
     async def upload_pdf(self, file: UploadFile, user_id: int) -> str:
         """
-        Uploads a PDF file to GridFS and saves its metadata.
+        Uploads a PDF file to GridFS, saves its metadata and queues its text extraction.
 
         Args:
             file: The UploadFile object from FastAPI.
             user_id: The ID of the user uploading the file.
 
         Returns:
-            The GridFS file ID as a string.
+            The GridFS file ID as a string. Files with the same content share one GridFS blob,
+            so this may be the ID of an earlier upload.
 
         Raises:
             InvalidPDFFormatException: If the uploaded file is empty.
+            PDFTooLargeException: If the uploaded file exceeds the maximum upload size.
             DatabaseOperationException: If there's an error with GridFS or metadata saving.
         """
-        contents = await file.read()
-        if not contents:
-            raise InvalidPDFFormatException("Uploaded file cannot be empty.")
+        if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+            raise PDFTooLargeException(f"Uploaded file exceeds the maximum size of {MAX_UPLOAD_BYTES} bytes.")
 
         try:
-            file_id_obj: ObjectId = self.fs.put(
-                contents,
-                filename=file.filename,
-                user_id=str(user_id),
-                content_type=file.content_type
+            grid_in = self.bucket.open_upload_stream(
+                file.filename,
+                metadata={"user_id": str(user_id), "content_type": file.content_type}
             )
         except Exception as e:
             raise DatabaseOperationException(f"Error uploading file to GridFS: {e}")
 
-        file_id_str = str(file_id_obj)
+        # The file is streamed chunk by chunk so memory use does not grow with its size.
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise PDFTooLargeException(f"Uploaded file exceeds the maximum size of {MAX_UPLOAD_BYTES} bytes.")
+                hasher.update(chunk)
+                await grid_in.write(chunk)
+            if size == 0:
+                raise InvalidPDFFormatException("Uploaded file cannot be empty.")
+            await grid_in.close()
+        except PDFException:
+            await grid_in.abort()
+            raise
+        except Exception as e:
+            await grid_in.abort()
+            raise DatabaseOperationException(f"Error uploading file to GridFS: {e}")
+
+        content_hash = hasher.hexdigest()
+        existing_doc = await self.metadata_collection.find_one(
+            {"user_id": user_id, "content_hash": content_hash}, {"gridfs_id": 1}
+        )
+        if existing_doc:
+            # The user already owns this content; the upload is idempotent.
+            await self.bucket.delete(grid_in._id)
+            return existing_doc["gridfs_id"]
+
+        file_id_str = await self._acquire_blob(content_hash, grid_in._id, size)
         metadata = {
             "user_id": user_id,
             "filename": file.filename,
             "upload_date": datetime.now(timezone.utc),
             "gridfs_id": file_id_str,
-            "content_type": file.content_type
+            "content_type": file.content_type,
+            "content_hash": content_hash,
+            "size": size
         }
         try:
-            self.metadata_collection.insert_one(metadata)
+            await self.metadata_collection.insert_one(metadata)
         except Exception as e:
-            self.fs.delete(file_id_obj)
+            await self._release_blob(content_hash, file_id_str)
             raise DatabaseOperationException(f"Error saving PDF metadata: {e}")
 
+        if await self.text_cache.get(content_hash) is None:
+            self._submit_extraction(file_id_str, content_hash)
+
         return file_id_str
 
-    def list_pdfs_for_user(self, user_id: int) -> List[Dict[str, Any]]:
+    async def delete_pdf(self, pdf_id_str: str, user_id: int) -> None:
         """
-        Lists all PDFs uploaded by a specific user.
+        Deletes a user's PDF. The underlying blob and its extracted text are removed
+        once no other upload references the same content.
 
         Args:
+            pdf_id_str: The GridFS ID of the PDF to delete.
             user_id: The ID of the user.
 
+        Raises:
+            PDFNotFoundException: If the PDF is not found for the user.
+            DatabaseOperationException: If the deletion fails.
+        """
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+
+        try:
+            await self.metadata_collection.delete_one({"_id": pdf_doc["_id"]})
+            await self.user_pdf_parser_collection.delete_one({"user_id": user_id, "source_pdf_id": pdf_id_str})
+            await self.user_pdf_selection_collection.delete_one({"user_id": user_id, "selected_pdf_id": pdf_id_str})
+            await self._release_blob(pdf_doc.get("content_hash"), pdf_id_str)
+            self._pdf_docs.pop((pdf_id_str, user_id), None)
+        except Exception as e:
+            raise DatabaseOperationException(f"Error deleting PDF (ID: {pdf_id_str}) for user {user_id}: {e}")
+
+    async def _acquire_blob(self, content_hash: str, file_id_obj: ObjectId, size: int) -> str:
+        """
+        Helper function to register a reference to the blob holding ``content_hash``.
+        The freshly uploaded file becomes the blob if none exists yet; otherwise it is
+        discarded in favour of the existing one.
+
+        Args:
+            content_hash: The content hash of the uploaded file.
+            file_id_obj: The GridFS ID of the freshly uploaded file.
+            size: The size of the file in bytes.
+
         Returns:
-            A list of dictionaries, each representing a PDF's metadata.
+            The GridFS ID (as a string) of the blob the upload should point at.
 
         Raises:
+            DatabaseOperationException: If the blob registry cannot be updated.
+        """
+        try:
+            for _ in range(3):
+                try:
+                    await self.blob_collection.insert_one({
+                        "_id": content_hash,
+                        "gridfs_id": str(file_id_obj),
+                        "ref_count": 1,
+                        "size": size,
+                        "created_at": datetime.now(timezone.utc)
+                    })
+                    return str(file_id_obj)
+                except DuplicateKeyError:
+                    blob = await self.blob_collection.find_one_and_update(
+                        {"_id": content_hash, "ref_count": {"$gt": 0}},
+                        {"$inc": {"ref_count": 1}},
+                        return_document=ReturnDocument.AFTER
+                    )
+                    # The blob may have been released concurrently, in which case the insert is retried.
+                    if blob:
+                        await self.bucket.delete(file_id_obj)
+                        return blob["gridfs_id"]
+            raise RuntimeError("blob registry kept changing concurrently")
+        except Exception as e:
+            await self.bucket.delete(file_id_obj)
+            raise DatabaseOperationException(f"Error registering PDF blob {content_hash}: {e}")
+
+    async def _release_blob(self, content_hash: Optional[str], gridfs_id_str: str) -> None:
+        """
+        Helper function to drop a reference to a blob, deleting the GridFS file and its
+        extracted text when the last reference goes away.
+
+        Args:
+            content_hash: The content hash of the blob (None for documents uploaded before deduplication).
+            gridfs_id_str: The GridFS ID of the blob.
+        """
+        blob = None
+        if content_hash:
+            blob = await self.blob_collection.find_one_and_update(
+                {"_id": content_hash, "gridfs_id": gridfs_id_str},
+                {"$inc": {"ref_count": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+
+        if blob is None:
+            # Files uploaded before deduplication are not in the blob registry and belong to one upload.
+            if not await self.metadata_collection.find_one({"gridfs_id": gridfs_id_str}, {"_id": 1}):
+                await self.bucket.delete(ObjectId(gridfs_id_str))
+            return
+
+        if blob["ref_count"] > 0:
+            return
+        result = await self.blob_collection.delete_one({"_id": content_hash, "ref_count": {"$lte": 0}})
+        if result.deleted_count:
+            await self.bucket.delete(ObjectId(gridfs_id_str))
+            await self.text_cache.invalidate(content_hash)
+            await self.chunk_index_store.invalidate(content_hash)
+
+    async def list_pdfs_for_user(self, user_id: int, limit: int = 100,
+                                 cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lists one page of the PDFs uploaded by a specific user, oldest first.
+
+        Pages are delimited by keyset on (upload_date, _id), so every page is a single range scan
+        of the {user_id, upload_date, _id} index however deep the client pages.
+
+        Args:
+            user_id: The ID of the user.
+            limit: Maximum number of PDFs in the page.
+            cursor: Continuation token returned with the previous page (optional).
+
+        Returns:
+            A list of dictionaries, each representing a PDF's metadata, and the token of the
+            next page (None on the last page).
+
+        Raises:
+            InvalidCursorException: If the cursor is malformed.
             DatabaseOperationException: If there's an error querying the database.
         """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                upload_date, last_id = position["upload_date"], ObjectId(position["id"])
+            except Exception:
+                raise InvalidCursorException(f"Invalid cursor: {cursor}")
+            query["$or"] = [
+                {"upload_date": {"$gt": upload_date}},
+                {"upload_date": upload_date, "_id": {"$gt": last_id}}
+            ]
+
         try:
-            pdf_cursor = self.metadata_collection.find({"user_id": user_id})
-            result = []
-            for pdf in pdf_cursor:
-                upload_date = pdf.get("upload_date")
-                result.append({
-                    "filename": pdf.get("filename"),
-                    "upload_date": upload_date.isoformat() if upload_date else None,
-                    "file_id": pdf.get("gridfs_id")
-                })
-            return result
+            # One extra document tells whether there is a next page.
+            pdf_cursor = self.metadata_collection.find(
+                query, {"filename": 1, "upload_date": 1, "gridfs_id": 1, "content_hash": 1}
+            ).sort([("upload_date", ASCENDING), ("_id", ASCENDING)]).limit(limit + 1)
+            docs = await pdf_cursor.to_list(length=limit + 1)
         except Exception as e:
             raise DatabaseOperationException(f"Error retrieving PDF list for user {user_id}: {e}")
 
-    def _get_pdf_metadata_and_validate_user(self, pdf_id_str: str, user_id: int) -> Dict[str, Any]:
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor({"upload_date": docs[-1].get("upload_date"), "id": str(docs[-1]["_id"])})
+
+        result = []
+        for pdf in docs:
+            upload_date = pdf.get("upload_date")
+            result.append({
+                "filename": pdf.get("filename"),
+                "upload_date": upload_date.isoformat() if upload_date else None,
+                "file_id": pdf.get("gridfs_id"),
+                "content_hash": pdf.get("content_hash")
+            })
+        return result, next_cursor
+
+    async def _get_pdf_metadata_and_validate_user(self, pdf_id_str: str, user_id: int) -> Dict[str, Any]:
         """
         Helper function to retrieve PDF metadata and validate user ownership.
+        The document is memoized for the life of the service instance.
 
         Args:
             pdf_id_str: The GridFS ID of the PDF (as a string).
@@ -121,22 +308,28 @@ class PDFService:
             InvalidPDFFormatException: If the pdf_id_str has an invalid format.
             PDFNotFoundException: If the PDF is not found for the given user.
         """
+        pdf_doc = self._pdf_docs.get((pdf_id_str, user_id))
+        if pdf_doc is not None:
+            return pdf_doc
+
         try:
             ObjectId(pdf_id_str)  # Validate ID format
         except Exception:
             raise InvalidPDFFormatException(f"Invalid PDF ID format: {pdf_id_str}")
 
-        pdf_doc = self.metadata_collection.find_one({
-            "user_id": user_id,
-            "gridfs_id": pdf_id_str
-        })
+        with track_stage("metadata_lookup"):
+            pdf_doc = await self.metadata_collection.find_one({
+                "user_id": user_id,
+                "gridfs_id": pdf_id_str
+            })
         if not pdf_doc:
             raise PDFNotFoundException(
                 f"PDF with ID '{pdf_id_str}' not found for user {user_id} or unauthorized access."
             )
+        self._pdf_docs[(pdf_id_str, user_id)] = pdf_doc
         return pdf_doc
 
-    def _get_pdf_bytes_from_gridfs(self, gridfs_id_str: str) -> bytes:
+    async def _get_pdf_bytes_from_gridfs(self, gridfs_id_str: str) -> bytes:
         """
         Helper function to retrieve PDF content (bytes) from GridFS.
 
@@ -152,15 +345,16 @@ class PDFService:
         """
         try:
             object_id = ObjectId(gridfs_id_str)
-            grid_out = self.fs.get(object_id)
-            pdf_bytes = grid_out.read()
+            with track_stage("gridfs_read"):
+                grid_out = await self.bucket.open_download_stream(object_id)
+                pdf_bytes = await grid_out.read()
             return pdf_bytes
         except NoFile:
             raise PDFNotFoundException(f"PDF file with GridFS ID '{gridfs_id_str}' not found in GridFS.")
         except Exception as e:
             raise DatabaseOperationException(f"Error reading PDF from GridFS (ID: {gridfs_id_str}): {e}")
 
-    def parse_pdf_text(self, pdf_id_str: str, user_id: int) -> str:
+    async def parse_pdf_text(self, pdf_id_str: str, user_id: int) -> str:
         """
         Parses text from a PDF file.
 
@@ -178,15 +372,13 @@ class PDFService:
             NoTextExtractedException: If no text is found in the PDF.
             DatabaseOperationException: If saving parsed text fails.
         """
-        self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)  # Validates existence and ownership
-
-        full_text = self.get_full_text(pdf_id_str, user_id)
+        full_text = await self.get_full_text(pdf_id_str, user_id)
 
         if not full_text.strip():
             raise NoTextExtractedException(f"No text could be extracted from PDF (ID: {pdf_id_str}).")
 
         try:
-            self.user_pdf_parser_collection.update_one(
+            await self.user_pdf_parser_collection.update_one(
                 {"user_id": user_id, "source_pdf_id": pdf_id_str},
                 {"$set": {
                     "text_content": full_text,
@@ -200,9 +392,10 @@ class PDFService:
 
         return full_text
 
-    def select_pdf_for_user(self, pdf_id_str: str, user_id: int) -> None:
+    async def select_pdf_for_user(self, pdf_id_str: str, user_id: int) -> None:
         """
-        Marks a PDF as selected for a user.
+        Marks a PDF as selected for a user. The text is not copied into the selection; it is
+        served from the text cache when needed.
 
         Args:
             pdf_id_str: The GridFS ID of the PDF to select.
@@ -212,55 +405,188 @@ class PDFService:
             PDFNotFoundException: If the PDF is not found for the user.
             DatabaseOperationException: If saving the selection fails.
         """
-        pdf_doc = self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
 
         try:
-            self.user_pdf_selection_collection.update_one(
+            await self.user_pdf_selection_collection.update_one(
                 {"user_id": user_id},
-                {"$set": {
-                    "selected_pdf_id": pdf_id_str,
-                    "selected_filename": pdf_doc.get("filename"),  # Store filename for convenience
-                    "selection_date": datetime.now(timezone.utc),
-                    "full_text": self.get_full_text(pdf_id_str, user_id)
-                }
+                {
+                    "$set": {
+                        "selected_pdf_id": pdf_id_str,
+                        "selected_filename": pdf_doc.get("filename"),  # Store filename for convenience
+                        "selection_date": datetime.now(timezone.utc)
+                    },
+                    "$unset": {"full_text": ""}
                 },
                 upsert=True
             )
         except Exception as e:
             raise DatabaseOperationException(f"Error saving PDF selection for user {user_id}, PDF ID {pdf_id_str}: {e}")
 
-    def get_full_text(self, pdf_id_str, user_id):
-        pdf_doc = self.metadata_collection.find_one({
-            "user_id": user_id,
-            "gridfs_id": pdf_id_str
-        })
-        if not pdf_doc:
-            raise PDFNotFoundException(
-                f"PDF with ID '{pdf_id_str}' not found for user {user_id} or unauthorized access."
-            )
+    async def get_full_text(self, pdf_id_str: str, user_id: int) -> str:
+        """
+        Returns the text content of a PDF, serving it from the text cache when possible.
+        The PDF is only read from GridFS and parsed on a cache miss.
+
+        Args:
+            pdf_id_str: The GridFS ID of the PDF.
+            user_id: The ID of the user requesting the text.
+
+        Returns:
+            The extracted text content as a string.
 
-        pdf_bytes = self._get_pdf_bytes_from_gridfs(pdf_id_str)
+        Raises:
+            PDFNotFoundException: If the PDF metadata or file is not found.
+            PDFParsingException: If text extraction fails.
+        """
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+        content_hash, pdf_bytes = await self._resolve_content_hash(pdf_doc)
+        return await self._get_text(pdf_id_str, content_hash, pdf_bytes)
+
+    async def get_chunk_index(self, pdf_id_str: str, user_id: int) -> ChunkIndex:
+        """
+        Returns the retrieval index over the chunks of a PDF's text. The index is built at
+        extraction time; documents extracted before retrieval was introduced are indexed on first use.
+
+        Args:
+            pdf_id_str: The GridFS ID of the PDF.
+            user_id: The ID of the user requesting the index.
 
-        pdf_stream = io.BytesIO(pdf_bytes)
+        Returns:
+            The chunk index of the PDF.
+
+        Raises:
+            PDFNotFoundException: If the PDF metadata or file is not found.
+            PDFParsingException: If text extraction fails.
+        """
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+        content_hash, pdf_bytes = await self._resolve_content_hash(pdf_doc)
+
+        index = await self.chunk_index_store.get(content_hash)
+        if index is not None:
+            return index
+        text = await self._get_text(pdf_id_str, content_hash, pdf_bytes)
+        index = await self.extraction_pipeline.run_in_executor(ChunkIndex.build, text)
+        await self.chunk_index_store.put(content_hash, index)
+        return index
+
+    async def _get_text(self, gridfs_id_str: str, content_hash: str, pdf_bytes: Optional[bytes] = None) -> str:
+        """
+        Helper function to return the extracted text of a content hash from the text cache,
+        waiting on the job queued at upload time or starting one if there is none in flight.
+        """
+        cached_text = await self.text_cache.get(content_hash)
+        if cached_text is not None:
+            return cached_text
+        return await ExtractionPipeline.wait(self._submit_extraction(gridfs_id_str, content_hash, pdf_bytes))
+
+    async def get_content_hash(self, pdf_id_str: str, user_id: int) -> str:
+        """
+        Returns the SHA-256 content hash of a user's PDF.
+
+        Args:
+            pdf_id_str: The GridFS ID of the PDF.
+            user_id: The ID of the user.
+
+        Returns:
+            The content hash as a hex string.
+
+        Raises:
+            PDFNotFoundException: If the PDF is not found for the user.
+        """
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+        content_hash, _ = await self._resolve_content_hash(pdf_doc)
+        return content_hash
+
+    async def _resolve_content_hash(self, pdf_doc: Dict[str, Any]) -> Tuple[str, Optional[bytes]]:
+        """
+        Helper function to return the content hash of a PDF metadata document. Documents uploaded
+        before content hashing was introduced are hashed and backfilled lazily.
+
+        Args:
+            pdf_doc: The PDF metadata document.
+
+        Returns:
+            The content hash, and the PDF bytes if they had to be read to compute it.
+        """
+        content_hash = pdf_doc.get("content_hash")
+        if content_hash:
+            return content_hash, None
+
+        pdf_bytes = await self._get_pdf_bytes_from_gridfs(pdf_doc["gridfs_id"])
+        content_hash = await self.extraction_pipeline.run_in_executor(compute_content_hash, pdf_bytes)
+        await self.metadata_collection.update_one({"_id": pdf_doc["_id"]}, {"$set": {"content_hash": content_hash}})
+        pdf_doc["content_hash"] = content_hash
+        return content_hash, pdf_bytes
+
+    async def get_extraction_status(self, pdf_id_str: str, user_id: int) -> Dict[str, Any]:
+        """
+        Returns the state and timings of the background text extraction of a PDF. A queued or running
+        job lost with the process running it (see `ExtractionPipeline.is_orphaned`) is resubmitted.
+
+        Args:
+            pdf_id_str: The GridFS ID of the PDF.
+            user_id: The ID of the user requesting the status.
+
+        Returns:
+            A dictionary with the job state, timestamps, timings and error message (if any).
+
+        Raises:
+            PDFNotFoundException: If the PDF is not found for the user.
+            DatabaseOperationException: If there's an error querying the database.
+        """
+        pdf_doc = await self._get_pdf_metadata_and_validate_user(pdf_id_str, user_id)
+        status = {"pdf_id": pdf_id_str, "state": JobState.NOT_STARTED.value}
+
+        content_hash = pdf_doc.get("content_hash")
+        if not content_hash:
+            return status
+
+        in_flight = self.extraction_pipeline.get_in_flight(content_hash) is not None
         try:
-            reader = PdfReader(pdf_stream)
-            if not reader.pages:
-                raise InvalidPDFFormatException("PDF file does not contain any pages.")
+            job = await self.extraction_pipeline.get_status(content_hash)
+            if job and self.extraction_pipeline.is_orphaned(job) and await self.extraction_pipeline.claim(job):
+                # The process running the job stopped before finishing it (e.g. a restart): run it again.
+                self._submit_extraction(pdf_doc["gridfs_id"], content_hash)
+                job = await self.extraction_pipeline.get_status(content_hash)
         except Exception as e:
-            raise PDFParsingException(f"Could not initialize PDF reader or file is unreadable (ID: {pdf_id_str}): {e}")
+            raise DatabaseOperationException(f"Error retrieving extraction status for PDF (ID: {pdf_id_str}): {e}")
+
+        if job:
+            job.pop("_id", None)
+            job.pop("gridfs_id", None)
+            job.pop("owner", None)
+            status.update(job)
+        elif in_flight:
+            status["state"] = JobState.QUEUED.value
+        elif await self.text_cache.get(content_hash) is not None:
+            status["state"] = JobState.DONE.value
+        return status
+
+    def _submit_extraction(self, gridfs_id_str: str, content_hash: str,
+                           pdf_bytes: Optional[bytes] = None) -> asyncio.Task:
+        """
+        Helper function to queue the extraction and chunk indexing of a PDF on the extraction pipeline.
 
-        full_text = ""
-        for i, page in enumerate(reader.pages):
-            try:
-                text = page.extract_text()
-                if text:
-                    full_text += text + "\n"
-            except Exception as e:
-                raise PDFParsingException(f"Error parsing page {i + 1} of PDF (ID: {pdf_id_str}): {e}")
+        Args:
+            gridfs_id_str: The GridFS ID of the PDF.
+            content_hash: The content hash of the PDF, used as the job ID and cache key.
+            pdf_bytes: The PDF content, if it has already been read (optional).
 
-        return full_text
+        Returns:
+            The task resolving to the extracted text.
+        """
+        async def extract() -> str:
+            data = pdf_bytes if pdf_bytes is not None else await self._get_pdf_bytes_from_gridfs(gridfs_id_str)
+            with track_stage("pdf_extraction"):
+                text, index = await self.extraction_pipeline.run_in_executor(_extract_and_index, data, gridfs_id_str)
+            await self.text_cache.put(content_hash, text)
+            await self.chunk_index_store.put(content_hash, index)
+            return text
 
-    def get_selected_pdf_for_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self.extraction_pipeline.submit(content_hash, extract, gridfs_id=gridfs_id_str)
+
+    async def get_selected_pdf_for_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
         Returns the selected PDF metadata for a given user from the user_pdf_selection collection.
 
@@ -275,8 +601,10 @@ class PDFService:
             DatabaseOperationException: If there's an error querying the database.
         """
         try:
-            selection = self.user_pdf_selection_collection.find_one(
-                {"user_id": user_id, "selected_pdf_id": {"$ne": None}})
+            # Selections saved by earlier versions still carry the full text; it is never shipped.
+            with track_stage("selection_lookup"):
+                selection = await self.user_pdf_selection_collection.find_one(
+                    {"user_id": user_id, "selected_pdf_id": {"$ne": None}}, {"full_text": 0})
             if not selection:
                 return None
 
@@ -287,3 +615,9 @@ class PDFService:
             return selection
         except Exception as e:
             raise DatabaseOperationException(f"Error retrieving selected PDF for user {user_id}: {e}")
+
+
+def _extract_and_index(pdf_bytes: bytes, pdf_id_str: str) -> Tuple[str, ChunkIndex]:
+    """Extracts the text of a PDF and builds its chunk index (CPU-bound, runs on the extraction executor)."""
+    text = extract_text(pdf_bytes, pdf_id_str)
+    return text, ChunkIndex.build(text)
@@ -0,0 +1,108 @@
+import math
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from app.config import settings
+from app.models.chat import ChatHistory, MessageDirection
+
+if TYPE_CHECKING:
+    from app.libs.services.retrieval import ChunkIndex
+
+PROMPT_TOKEN_BUDGET = settings.prompt_token_budget
+PROMPT_HISTORY_MAX_MESSAGES = settings.prompt_history_max_messages
+# Smallest part of an old message worth keeping when it has to be trimmed to fit.
+PROMPT_MIN_TRIMMED_TOKENS = settings.prompt_min_trimmed_tokens
+# Approximate per-message cost of roles and separators in the chat format.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SYSTEM_PROMPT = (
+    "You are an AI assistant that helps users by answering questions based on a selected PDF document. "
+    "Respond concisely and helpfully, and only use PDF content. If unsure, admit it."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Returns a rough estimate of the number of model tokens in a text (about 4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def _message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class Prompt:
+    messages: List[Dict[str, str]]
+    token_estimate: int
+    history_messages: int
+
+
+class PromptBuilder:
+    """
+    Assembles the messages sent to the model within a token budget.
+
+    Parts are added by priority: the system prompt and the question always, then the document
+    excerpts (up to the retrieval budget), then as much recent conversation history as still fits.
+    History is filled newest first, so the oldest turns are trimmed or dropped first.
+    """
+
+    def __init__(self, token_budget: int = PROMPT_TOKEN_BUDGET, system_prompt: str = SYSTEM_PROMPT):
+        """
+        Args:
+            token_budget: Maximum estimated number of tokens of the whole prompt.
+            system_prompt: The instructions sent as the system message.
+        """
+        self.token_budget = token_budget
+        self.system_prompt = system_prompt
+
+    def build(self, question: str, chunk_index: "ChunkIndex", history: Sequence[ChatHistory],
+              context_token_budget: int) -> Prompt:
+        """
+        Builds the prompt for a question.
+
+        Args:
+            question: The current message from the user.
+            chunk_index: The retrieval index of the selected PDF.
+            history: Previous messages of the conversation, newest first.
+            context_token_budget: Maximum estimated number of tokens of the document excerpts.
+
+        Returns:
+            The messages, their estimated token count and the number of history messages included.
+        """
+        system_message = {"role": "system", "content": self.system_prompt}
+        question_message = {"role": "user", "content": question}
+        used = _message_tokens(system_message["content"]) + _message_tokens(question)
+
+        context_prefix = "Relevant excerpts of the PDF are: "
+        context_budget = min(context_token_budget, self.token_budget - used - _message_tokens(context_prefix))
+        context_messages = []
+        if context_budget > 0:
+            excerpts = chunk_index.select(question, token_budget=context_budget)
+            content = context_prefix + "\n\n---\n\n".join(excerpts)
+            context_messages.append({"role": "user", "content": content})
+            used += _message_tokens(content)
+
+        history_messages = []
+        for entry in history:
+            remaining = self.token_budget - used
+            tokens = _message_tokens(entry.message)
+            content = entry.message
+            if tokens > remaining:
+                # Keep the end of the oldest message that still partly fits, if enough of it is left.
+                keep_tokens = remaining - MESSAGE_OVERHEAD_TOKENS
+                if keep_tokens < PROMPT_MIN_TRIMMED_TOKENS:
+                    break
+                content = "..." + entry.message[-(keep_tokens * 4 - 3):]
+                tokens = _message_tokens(content)
+            role = "user" if entry.direction == MessageDirection.OUTGOING else "assistant"
+            history_messages.append({"role": role, "content": content})
+            used += tokens
+            if content is not entry.message:
+                break
+        history_messages.reverse()
+
+        return Prompt(
+            messages=[system_message, *history_messages, *context_messages, question_message],
+            token_estimate=used,
+            history_messages=len(history_messages)
+        )
@@ -0,0 +1,217 @@
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.config import settings
+from app.libs.cache import LRUCache
+from app.libs.services.prompt import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+CHUNK_WORDS = settings.retrieval_chunk_words
+CHUNK_OVERLAP_WORDS = settings.retrieval_chunk_overlap_words
+TOP_K = settings.retrieval_top_k
+CONTEXT_TOKEN_BUDGET = settings.retrieval_context_token_budget
+INDEX_CACHE_ENTRIES = settings.retrieval_index_cache_entries
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase word tokens."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS, overlap_words: int = CHUNK_OVERLAP_WORDS) -> List[str]:
+    """
+    Splits text into overlapping chunks of roughly ``chunk_words`` words.
+
+    Args:
+        text: The text to split.
+        chunk_words: Number of words per chunk.
+        overlap_words: Number of words shared by consecutive chunks.
+
+    Returns:
+        The list of chunks, in document order.
+    """
+    words = text.split()
+    step = max(chunk_words - overlap_words, 1)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+class ChunkIndex:
+    """
+    BM25 index over the chunks of a document.
+
+    Term frequencies are kept as a sparse chunk-by-term matrix in CSR form
+    (``indptr``, ``term_ids``, ``counts``), so scoring a query is a handful of NumPy operations.
+    """
+
+    def __init__(self, chunks: List[str], vocabulary: List[str], indptr: np.ndarray, term_ids: np.ndarray,
+                 counts: np.ndarray):
+        self.chunks = chunks
+        self.vocabulary = vocabulary
+        self.term_lookup = {term: i for i, term in enumerate(vocabulary)}
+        self.indptr = indptr
+        self.term_ids = term_ids
+        self.counts = counts
+
+        self.chunk_ids = np.repeat(np.arange(len(chunks)), np.diff(indptr))
+        self.chunk_lengths = np.bincount(self.chunk_ids, weights=counts, minlength=len(chunks))
+        self.average_length = self.chunk_lengths.mean() if len(chunks) else 0.0
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+        self.idf = np.log1p((len(chunks) - document_frequency + 0.5) / (document_frequency + 0.5))
+        self.token_estimates = [estimate_tokens(chunk) for chunk in chunks]
+
+    @classmethod
+    def build(cls, text: str) -> "ChunkIndex":
+        """Splits a text into chunks and indexes them."""
+        chunks = chunk_text(text)
+        term_lookup: Dict[str, int] = {}
+        indptr = [0]
+        term_ids: List[int] = []
+        counts: List[int] = []
+        for chunk in chunks:
+            for term, count in Counter(tokenize(chunk)).items():
+                term_ids.append(term_lookup.setdefault(term, len(term_lookup)))
+                counts.append(count)
+            indptr.append(len(term_ids))
+
+        return cls(
+            chunks,
+            list(term_lookup),
+            np.array(indptr, dtype=np.int64),
+            np.array(term_ids, dtype=np.int32),
+            np.array(counts, dtype=np.int32)
+        )
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "ChunkIndex":
+        """Restores an index persisted with ``to_document``."""
+        return cls(
+            doc["chunks"],
+            doc["vocabulary"],
+            np.frombuffer(doc["indptr"], dtype=np.int64),
+            np.frombuffer(doc["term_ids"], dtype=np.int32),
+            np.frombuffer(doc["counts"], dtype=np.int32)
+        )
+
+    def to_document(self) -> Dict[str, Any]:
+        """Returns a MongoDB-storable representation of the index."""
+        return {
+            "chunks": self.chunks,
+            "vocabulary": self.vocabulary,
+            "indptr": Binary(self.indptr.tobytes()),
+            "term_ids": Binary(self.term_ids.tobytes()),
+            "counts": Binary(self.counts.tobytes())
+        }
+
+    def score(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every chunk for a query."""
+        query_ids = [self.term_lookup[term] for term in set(tokenize(query)) if term in self.term_lookup]
+        if not query_ids or not self.chunks:
+            return np.zeros(len(self.chunks))
+
+        mask = np.isin(self.term_ids, query_ids)
+        chunk_ids = self.chunk_ids[mask]
+        tf = self.counts[mask]
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.chunk_lengths[chunk_ids] / self.average_length)
+        contributions = self.idf[self.term_ids[mask]] * tf * (BM25_K1 + 1) / (tf + length_norm)
+        return np.bincount(chunk_ids, weights=contributions, minlength=len(self.chunks))
+
+    def select(self, query: str, top_k: int = TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET) -> List[str]:
+        """
+        Returns the best-scoring chunks for a query that fit in the token budget, in document order.
+        If no chunk matches the query, the chunks from the start of the document are used.
+
+        Args:
+            query: The user's question.
+            top_k: Maximum number of chunks to return.
+            token_budget: Maximum estimated number of tokens across the returned chunks.
+        """
+        scores = self.score(query)
+        # A stable sort keeps document order among chunks with equal scores.
+        ranked = np.argsort(-scores, kind="stable")
+        if scores.any():
+            ranked = ranked[scores[ranked] > 0]
+
+        selected = []
+        used_tokens = 0
+        for chunk_id in ranked:
+            if len(selected) == top_k:
+                break
+            tokens = self.token_estimates[chunk_id]
+            if used_tokens + tokens > token_budget:
+                continue
+            selected.append(int(chunk_id))
+            used_tokens += tokens
+
+        return [self.chunks[chunk_id] for chunk_id in sorted(selected)]
+
+
+class ChunkIndexStore:
+    """
+    Stores chunk indexes next to the extracted text, keyed by the content hash of the PDF.
+    Loaded indexes are kept in a bounded in-process LRU in front of MongoDB.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, max_entries: int = INDEX_CACHE_ENTRIES):
+        """
+        Args:
+            collection: The MongoDB collection persisting the indexes.
+            max_entries: Maximum number of indexes kept in memory.
+        """
+        self.collection = collection
+        self.memory = LRUCache(max_entries)
+
+    async def get(self, content_hash: str) -> Optional[ChunkIndex]:
+        """Returns the index of a content hash, or None if it has not been built yet."""
+        index = self.memory.get(content_hash)
+        if index is not None:
+            return index
+
+        try:
+            doc = await self.collection.find_one({"_id": content_hash})
+        except Exception as e:
+            logger.warning(f"Chunk index lookup failed for {content_hash}: {e}")
+            return None
+        if not doc:
+            return None
+
+        index = ChunkIndex.from_document(doc)
+        self.memory.put(content_hash, index)
+        return index
+
+    async def put(self, content_hash: str, index: ChunkIndex) -> None:
+        """Stores an index (built with `ChunkIndex.build`) in both tiers."""
+        self.memory.put(content_hash, index)
+        try:
+            await self.collection.update_one(
+                {"_id": content_hash},
+                {"$set": {**index.to_document(), "created_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist chunk index for {content_hash}: {e}")
+
+    async def invalidate(self, content_hash: str) -> None:
+        """Removes the index of a content hash from both tiers."""
+        self.memory.pop(content_hash)
+        try:
+            await self.collection.delete_one({"_id": content_hash})
+        except Exception as e:
+            logger.warning(f"Could not invalidate chunk index for {content_hash}: {e}")
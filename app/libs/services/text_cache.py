@@ -0,0 +1,80 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.config import settings
+from app.libs.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+TEXT_CACHE_MAX_ENTRIES = settings.pdf_text_cache_max_entries
+TEXT_CACHE_MAX_BYTES = settings.pdf_text_cache_max_bytes
+
+
+def compute_content_hash(pdf_bytes: bytes) -> str:
+    """Returns the SHA-256 hex digest used to address a PDF's content."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class TextCache:
+    """
+    Content-addressed cache for text extracted from PDFs.
+
+    Entries are keyed by the SHA-256 of the PDF bytes, so identical files share one entry.
+    A bounded in-process LRU tier sits in front of a persistent MongoDB tier.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection, max_entries: int = TEXT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = TEXT_CACHE_MAX_BYTES):
+        """
+        Args:
+            collection: The MongoDB collection backing the persistent tier.
+            max_entries: Maximum number of texts kept in memory.
+            max_bytes: Maximum total size (in characters) of the texts kept in memory.
+        """
+        self.collection = collection
+        self.memory = LRUCache(max_entries, max_weight=max_bytes, weigher=len)
+
+    async def get(self, content_hash: str) -> Optional[str]:
+        """
+        Returns the cached text for a content hash, or None if it has not been extracted yet.
+        A hit in the persistent tier is promoted into memory.
+        """
+        text = self.memory.get(content_hash)
+        if text is not None:
+            return text
+
+        try:
+            doc = await self.collection.find_one({"_id": content_hash}, {"text": 1})
+        except Exception as e:
+            logger.warning(f"Text cache lookup failed for {content_hash}: {e}")
+            return None
+        if not doc:
+            return None
+
+        text = doc["text"]
+        self.memory.put(content_hash, text)
+        return text
+
+    async def put(self, content_hash: str, text: str) -> None:
+        """Stores extracted text in both tiers. Persistent tier failures are logged, not raised."""
+        self.memory.put(content_hash, text)
+        try:
+            await self.collection.update_one(
+                {"_id": content_hash},
+                {"$set": {"text": text, "created_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not persist extracted text for {content_hash}: {e}")
+
+    async def invalidate(self, content_hash: str) -> None:
+        """Removes a content hash from both tiers."""
+        self.memory.pop(content_hash)
+        try:
+            await self.collection.delete_one({"_id": content_hash})
+        except Exception as e:
+            logger.warning(f"Could not invalidate extracted text for {content_hash}: {e}")
@@ -0,0 +1,327 @@
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.routing import Match
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_THRESHOLD_MS = settings.slow_request_threshold_ms
+SLOW_REQUEST_LOG_PATH = settings.slow_request_log_path
+SLOW_REQUEST_LOG_MAX_BYTES = settings.slow_request_log_max_bytes
+SLOW_REQUEST_LOG_BACKUP_COUNT = settings.slow_request_log_backup_count
+PROFILE_DIR = settings.profile_dir
+# Spans recorded per request beyond this are dropped, so a runaway loop cannot grow a trace without bound.
+TRACE_MAX_SPANS = settings.trace_max_spans
+
+BACKGROUND_ROUTE = "background"
+# Route template of the request being served (e.g. "/chat/pdf-chat/"); work outside a request is "background".
+current_route: ContextVar[str] = ContextVar("current_route", default=BACKGROUND_ROUTE)
+
+
+def match_route(scope) -> str:
+    """Returns the template of the route matching an ASGI scope, or "unmatched"."""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration: Optional[float] = None
+    outcome: str = "ok"
+    children: List["Span"] = field(default_factory=list)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "outcome": self.outcome,
+            "children": [child.to_dict(origin) for child in self.children]
+        }
+
+
+@dataclass
+class Trace:
+    """The timeline of one request: its stages as a tree of spans."""
+    request_id: str
+    method: str
+    path: str
+    route: str
+    root: Span
+    span_count: int = 0
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Records a block as a span of the current request's trace, nested under the enclosing span.
+    Outside a traced request this does nothing.
+
+    Args:
+        name: Name of the span (e.g. "gridfs_read").
+    """
+    trace = _current_trace.get()
+    if trace is None or trace.span_count >= TRACE_MAX_SPANS:
+        yield
+        return
+
+    trace.span_count += 1
+    new_span = Span(name, time.perf_counter())
+    (_current_span.get() or trace.root).children.append(new_span)
+    token = _current_span.set(new_span)
+    try:
+        yield
+    except BaseException:
+        new_span.outcome = "error"
+        raise
+    finally:
+        new_span.duration = time.perf_counter() - new_span.start
+        _current_span.reset(token)
+
+
+def detach_from_request() -> None:
+    """
+    Marks the current task as background work. Tasks started while serving a request inherit a
+    copy of its context: call this first in such a task so its stages are labeled with
+    ``BACKGROUND_ROUTE`` and not recorded in the (possibly finished) trace of that request.
+    """
+    current_route.set(BACKGROUND_ROUTE)
+    _current_trace.set(None)
+    _current_span.set(None)
+
+
+_slow_request_logger: Optional[logging.Logger] = None
+
+
+def _get_slow_request_logger() -> logging.Logger:
+    """Returns the logger writing slow requests to the rotating log file, creating it on first use."""
+    global _slow_request_logger
+    if _slow_request_logger is None:
+        os.makedirs(os.path.dirname(SLOW_REQUEST_LOG_PATH) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_REQUEST_LOG_PATH, maxBytes=SLOW_REQUEST_LOG_MAX_BYTES, backupCount=SLOW_REQUEST_LOG_BACKUP_COUNT
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_logger = logging.getLogger("app.slow_requests")
+        slow_logger.addHandler(handler)
+        slow_logger.setLevel(logging.INFO)
+        slow_logger.propagate = False
+        _slow_request_logger = slow_logger
+    return _slow_request_logger
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stacks of every other thread at a fixed interval and counts them in collapsed form."""
+
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join([names.get(thread_id, str(thread_id))] + frames[::-1])] += 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class Profiler:
+    """
+    On-demand profiling of the next requests to a route.
+
+    `arm` schedules a capture of the next ``count`` requests to a route, either with `cProfile`
+    (deterministic, every call of the serving thread) or with a stack sampler (low overhead, all
+    threads, including the extraction workers). Captures run one at a time: cProfile attributes
+    every coroutine interleaved on the event loop to the profile, so requests served concurrently
+    show up in it too. Each capture is saved to ``PROFILE_DIR``: ``.prof`` files for cProfile
+    (open them with `pstats` or snakeviz), ``.collapsed`` files for the sampler (flame graph input).
+    """
+
+    MODES = ("cprofile", "stack")
+
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self._armed: Dict[str, Dict[str, Any]] = {}
+        self._active = False
+        self._lock = threading.Lock()
+
+    def arm(self, route: str, count: int, mode: str = "cprofile", interval_ms: float = 5) -> None:
+        """
+        Profiles the next ``count`` requests to ``route``.
+
+        Args:
+            route: The route template (e.g. "/chat/pdf-chat/").
+            count: Number of requests to profile.
+            mode: "cprofile" or "stack".
+            interval_ms: Sampling interval of the stack sampler.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self._lock:
+            self._armed[route] = {"remaining": count, "mode": mode, "interval_ms": interval_ms}
+
+    def disarm(self, route: Optional[str] = None) -> None:
+        """Cancels the pending captures of a route, or of every route."""
+        with self._lock:
+            if route is None:
+                self._armed.clear()
+            else:
+                self._armed.pop(route, None)
+
+    def status(self) -> Dict[str, Any]:
+        """Returns the pending captures and the saved profiles."""
+        with self._lock:
+            armed = {route: dict(options) for route, options in self._armed.items()}
+        profiles = sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []
+        return {"armed": armed, "active": self._active, "profiles": profiles}
+
+    @contextmanager
+    def capture(self, route: str, request_id: str) -> Iterator[None]:
+        """Profiles the enclosed request if a capture is pending for its route and none is running."""
+        with self._lock:
+            options = self._armed.get(route)
+            if options is None or self._active:
+                options = None
+            else:
+                self._active = True
+                options["remaining"] -= 1
+                if options["remaining"] <= 0:
+                    del self._armed[route]
+        if options is None:
+            yield
+            return
+
+        try:
+            if options["mode"] == "cprofile":
+                profile = cProfile.Profile()
+                profile.enable()
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                    profile.dump_stats(self._path(route, request_id, "prof"))
+            else:
+                sampler = _StackSampler(options["interval_ms"] / 1000)
+                sampler.start()
+                try:
+                    yield
+                finally:
+                    sampler.stop()
+                    with open(self._path(route, request_id, "collapsed"), "w") as f:
+                        f.writelines(f"{stack} {count}\n" for stack, count in sampler.samples.most_common())
+        finally:
+            self._active = False
+
+    def _path(self, route: str, request_id: str, extension: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        return os.path.join(self.directory, f"{timestamp}_{slug}_{request_id}.{extension}")
+
+
+profiler = Profiler()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware recording the timeline of every HTTP request as a tree of spans (see `span`).
+
+    Requests slower than ``SLOW_REQUEST_THRESHOLD_MS`` (including streamed bodies) are written
+    with their timeline, as one JSON line, to the rotating log at ``SLOW_REQUEST_LOG_PATH``.
+    Requests are also profiled when `profiler` has a capture pending for their route. The
+    request ID is returned in the ``X-Request-ID`` header so a client can find its entry.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = current_route.get()
+        route_token = None
+        if route == BACKGROUND_ROUTE:
+            route = match_route(scope)
+            route_token = current_route.set(route)
+
+        request_id = uuid.uuid4().hex[:16]
+        trace = Trace(request_id, scope["method"], scope["path"], route, Span("request", time.perf_counter()))
+        trace_token = _current_trace.set(trace)
+        status: List[int] = [500]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            with profiler.capture(route, request_id):
+                await self.app(scope, receive, send_with_request_id)
+        except BaseException:
+            trace.root.outcome = "error"
+            raise
+        finally:
+            trace.root.duration = time.perf_counter() - trace.root.start
+            _current_trace.reset(trace_token)
+            if route_token is not None:
+                current_route.reset(route_token)
+            if trace.root.duration * 1000 >= SLOW_REQUEST_THRESHOLD_MS:
+                self._log_slow_request(trace, status[0])
+
+    @staticmethod
+    def _log_slow_request(trace: Trace, status: int) -> None:
+        try:
+            _get_slow_request_logger().info(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "request_id": trace.request_id,
+                "method": trace.method,
+                "path": trace.path,
+                "route": trace.route,
+                "status": status,
+                "duration_ms": round(trace.root.duration * 1000, 2),
+                "timeline": trace.root.to_dict(trace.root.start)
+            }))
+        except Exception as e:
+            logger.warning(f"Could not write slow request {trace.request_id}: {e}")
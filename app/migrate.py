@@ -0,0 +1,33 @@
+"""
+Creates the database schema: the PostgreSQL tables and the PostgreSQL and MongoDB indexes.
+
+Run it once per deployment, before the application starts (``python -m app.migrate``), so the
+workers do not introspect the schema on every start. Every step is idempotent. Set
+MIGRATE_ON_STARTUP=true to run it from the application lifespan instead (local development).
+"""
+import asyncio
+import sys
+
+
+async def migrate() -> None:
+    """Creates the missing tables and indexes."""
+    from app.libs.indexes import apply_indexes
+    from db import create_db_and_tables, get_engine, get_mongo_db
+
+    await create_db_and_tables()
+    await apply_indexes(get_mongo_db(), get_engine())
+
+
+async def _main() -> int:
+    from db import close_databases
+
+    try:
+        await migrate()
+        print("Database schema is up to date.")
+        return 0
+    finally:
+        await close_databases()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -1,5 +1,5 @@
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEEnum, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -23,4 +23,11 @@ class ChatHistory(Base):
     direction = Column(SQLEEnum(MessageDirection), nullable=False)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
 
-    user = relationship(User, back_populates="chat_histories")
\ No newline at end of file
+    user = relationship(User, back_populates="chat_histories")
+
+    __table_args__ = (
+        # Serves the conversation lookup: filter by user and PDF, newest first.
+        Index("ix_chat_history_user_id_pdf_hash_created_at", user_id, pdf_hash, created_at.desc()),
+        # Serves the paginated history of all PDFs: keyset on (created_at, id), newest first.
+        Index("ix_chat_history_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+    )
\ No newline at end of file
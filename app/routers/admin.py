@@ -0,0 +1,37 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from app.libs.hash import get_current_admin
+from app.libs.tracing import profiler
+from app.schemas.admin import ProfilingRequest, ProfilingStatusResponse
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_admin)]
+)
+
+
+@router.post("/profiling/", response_model=ProfilingStatusResponse)
+async def arm_profiling(request: ProfilingRequest, http_request: Request):
+    """
+    Profiles the next `count` requests to a route. Profiles are saved to the server's PROFILE_DIR.
+    """
+    if request.route not in {getattr(route, "path", None) for route in http_request.app.routes}:
+        raise HTTPException(status_code=404, detail=f"Unknown route: {request.route}")
+    profiler.arm(request.route, request.count, request.mode, request.interval_ms)
+    return profiler.status()
+
+
+@router.get("/profiling/", response_model=ProfilingStatusResponse)
+async def profiling_status():
+    """Lists the pending captures and the saved profiles."""
+    return profiler.status()
+
+
+@router.delete("/profiling/", response_model=ProfilingStatusResponse)
+async def disarm_profiling(route: Optional[str] = Query(None, description="Route to disarm (default: all)")):
+    """Cancels pending captures."""
+    profiler.disarm(route)
+    return profiler.status()
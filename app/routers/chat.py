@@ -1,16 +1,20 @@
 import logging
-from typing import Optional, List
+from typing import Callable, Optional
 
 from fastapi import Depends, HTTPException, APIRouter, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.libs.hash import get_current_user
+from app.libs.pagination import InvalidCursorException
+from app.libs.services.admission import RateLimitExceededException, get_admission_controller
 from app.libs.services.chat import ChatHistoryService
 from app.libs.services.gemini import ChatService
-from app.models.user import User
-from app.routers.pdf import get_pdf_service
-from app.schemas.chat import ChatRequest, ChatResponse
-from db import get_session
+from app.libs.services.loader import PDFRequestLoader
+from app.routers.pdf import get_pdf_loader
+from app.schemas.chat import ChatRequest, ChatResponse, ChatHistoryPage
+from app.schemas.user import UserResponse
+from db import get_session, get_session_maker
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
@@ -19,34 +23,117 @@ router = APIRouter(
 )
 
 
+class SlotStreamingResponse(StreamingResponse):
+    """
+    Streaming response holding an in-flight slot. The body gives the slot back when it ends; the
+    response also does once it is sent, for a body that never started (client gone before the headers).
+    """
+
+    def __init__(self, content, release_slot: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release_slot = release_slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release_slot()
+
+
+def _too_many_requests(e: RateLimitExceededException) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def admit_chat_request(current_user: UserResponse = Depends(get_current_user)) -> UserResponse:
+    """
+    Takes a chat request from the user's rate limits before any other work is done, and returns the user.
+
+    Raises:
+        HTTPException: If the user is over their limits (status code 429, with a Retry-After header).
+    """
+    try:
+        await get_admission_controller().check(int(current_user.id))
+    except RateLimitExceededException as e:
+        raise _too_many_requests(e)
+    return current_user
+
+
 @router.post("/pdf-chat/")
-def pdf_chat(request: ChatRequest, session: Session = Depends(get_session),
-             current_user: User = Depends(get_current_user)):
-    chat_service = ChatService(session)
-    selected_pdf = get_pdf_service().get_selected_pdf_for_user(int(current_user.id))
-
-    response = chat_service.send_chat(
-        user_id=current_user.id,
-        current_user_message=request.message,
-        pdf_id=selected_pdf["selected_pdf_id"],
+async def pdf_chat(request: ChatRequest, session: AsyncSession = Depends(get_session),
+                   pdf_loader: PDFRequestLoader = Depends(get_pdf_loader),
+                   current_user: UserResponse = Depends(admit_chat_request)):
+    chat_service = ChatService(session, pdf_loader)
+    selected_pdf = await pdf_loader.get_selection(int(current_user.id))
+
+    try:
+        response, prompt_tokens = await chat_service.send_chat(
+            user_id=current_user.id,
+            current_user_message=request.message,
+            pdf_id=selected_pdf["selected_pdf_id"],
+            use_cache=request.use_cache,
+            refresh_cache=request.refresh_cache,
+        )
+    except RateLimitExceededException as e:
+        raise _too_many_requests(e)
+    return {"message": response, "prompt_tokens": prompt_tokens}
+
+
+@router.post("/pdf-chat/stream/")
+async def pdf_chat_stream(request: ChatRequest, pdf_loader: PDFRequestLoader = Depends(get_pdf_loader),
+                          current_user: UserResponse = Depends(admit_chat_request)):
+    """
+    Streams the assistant's answer as Server-Sent Events (`token`, then `done` or `error`).
+    The in-flight slot is taken before the response starts, so a full queue is a 429 with Retry-After.
+    """
+    selected_pdf = await pdf_loader.get_selection(int(current_user.id))
+    user_id = current_user.id
+    try:
+        release_slot = await get_admission_controller().acquire_slot(int(user_id))
+    except RateLimitExceededException as e:
+        raise _too_many_requests(e)
+
+    async def event_stream():
+        try:
+            # The request-scoped session is closed before the body is streamed, so the stream owns its own.
+            async with get_session_maker()() as session:
+                async for event in ChatService(session, pdf_loader).stream_chat(
+                    user_id=user_id,
+                    current_user_message=request.message,
+                    pdf_id=selected_pdf["selected_pdf_id"],
+                    use_cache=request.use_cache,
+                    refresh_cache=request.refresh_cache,
+                ):
+                    yield event
+        finally:
+            release_slot()
+
+    return SlotStreamingResponse(
+        event_stream(),
+        release_slot,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    return {"message": response}
 
 
-@router.get("/chat-history/", response_model=List[ChatResponse])
-def chat_history(
-        session: Session = Depends(get_session),
-        pdf_hash: Optional[str] = Query(None, description="Optional hash of the PDF to filter conversation"),
-        limit: Optional[int] = Query(50, ge=1, le=1000, description="Number of latest messages to retrieve"),
-        current_user: User = Depends(get_current_user)):
+@router.get("/chat-history/", response_model=ChatHistoryPage)
+async def chat_history(
+        session: AsyncSession = Depends(get_session),
+        pdf_hash: Optional[str] = Query(None, description="Optional content hash of the PDF to filter conversation"),
+        limit: int = Query(50, ge=1, le=200, description="Number of messages per page"),
+        cursor: Optional[str] = Query(None, description="Continuation token returned with the previous page"),
+        current_user: UserResponse = Depends(get_current_user)):
+    """Returns the user's chat history newest first, one page at a time."""
     try:
         chat_service = ChatHistoryService(session)
-        history = chat_service.get_conversation(
+        rows, next_cursor = await chat_service.get_history_page(
             user_id=current_user.id,
             pdf_hash=pdf_hash,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
-        return history
+        return ChatHistoryPage(items=[ChatResponse(**row._mapping) for row in rows], next_cursor=next_cursor)
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.exception("Failed to retrieve chat history")
         raise HTTPException(status_code=500, detail="Could not retrieve chat history") from e
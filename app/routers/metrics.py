@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.libs.metrics import render_latest
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Exposes the application metrics in the Prometheus text format."""
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,14 +1,23 @@
 import logging
+from dataclasses import dataclass
 
-import gridfs
-from fastapi import Depends, APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import Depends, APIRouter, HTTPException, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from fastapi import UploadFile
 
 from app.libs.exceptions.pdf import PDFException, InvalidPDFFormatException
 from app.libs.hash import get_current_user
+from app.libs.metrics import register_cache, register_pool
+from app.libs.pagination import InvalidCursorException
+from app.libs.services.extraction import ExtractionPipeline
+from app.libs.services.loader import PDFRequestLoader
 from app.libs.services.pdf import PDFService
-from app.schemas.pdf import PDFSelectRequest
-from db import client
+from app.libs.services.retrieval import ChunkIndexStore
+from app.libs.services.text_cache import TextCache
+from app.schemas.pdf import PDFSelectRequest, PDFStatusResponse
+from db import get_mongo_db
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
@@ -16,15 +25,61 @@ router = APIRouter(
     tags=["pdf"]
 )
 
-db = client["pdf_storage"]
-fs = gridfs.GridFS(db)
-metadata_collection = db["pdf_metadata"]
+
+@dataclass
+class PDFResources:
+    """The process-wide objects shared by every `PDFService`."""
+    db: AsyncIOMotorDatabase
+    text_cache: TextCache
+    chunk_index_store: ChunkIndexStore
+    extraction_pipeline: ExtractionPipeline
+
+
+_pdf_resources: Optional[PDFResources] = None
+
+
+def get_pdf_resources() -> PDFResources:
+    """Returns the process-wide PDF resources, creating them (and the MongoDB client) on first use."""
+    global _pdf_resources
+    if _pdf_resources is None:
+        db = get_mongo_db()
+        _pdf_resources = PDFResources(
+            db=db,
+            text_cache=TextCache(db["pdf_text_cache"]),
+            chunk_index_store=ChunkIndexStore(db["pdf_chunk_index"]),
+            extraction_pipeline=ExtractionPipeline(db["pdf_extraction_jobs"])
+        )
+        register_cache("pdf_text", _pdf_resources.text_cache.memory)
+        register_cache("pdf_chunk_index", _pdf_resources.chunk_index_store.memory)
+    return _pdf_resources
+
+
+async def close_pdf_resources() -> None:
+    """Waits for the running extraction jobs and drops the PDF resources if they were created."""
+    global _pdf_resources
+    if _pdf_resources is not None:
+        await _pdf_resources.extraction_pipeline.shutdown()
+        _pdf_resources = None
+
+
+register_pool(
+    "pdf_extraction",
+    in_use=lambda: _pdf_resources.extraction_pipeline.stats()["running"] if _pdf_resources else 0,
+    capacity=lambda: _pdf_resources.extraction_pipeline.max_workers if _pdf_resources else 0,
+    waiting=lambda: _pdf_resources.extraction_pipeline.stats()["queued"] if _pdf_resources else 0
+)
 
 
 def get_pdf_service(
 ) -> PDFService:
     """FastAPI dependency to get an instance of PDFService."""
-    return PDFService(db, fs)
+    resources = get_pdf_resources()
+    return PDFService(resources.db, resources.text_cache, resources.chunk_index_store, resources.extraction_pipeline)
+
+
+def get_pdf_loader(pdf_service: PDFService = Depends(get_pdf_service)) -> PDFRequestLoader:
+    """FastAPI dependency to get the request-scoped PDF data loader."""
+    return PDFRequestLoader(pdf_service)
 
 
 @router.post("/pdf-upload/", response_model=None)
@@ -33,6 +88,7 @@ async def pdf_upload(file: UploadFile, pdf_service: PDFService = Depends(get_pdf
     """
     Handles the uploading of a PDF file.
     The file is stored in GridFS, and its metadata is saved in the database.
+    Text extraction is queued in the background; its progress is reported by `/pdf/{pdf_id}/status`.
     """
 
     if file.content_type != "application/pdf":
@@ -56,12 +112,16 @@ async def pdf_upload(file: UploadFile, pdf_service: PDFService = Depends(get_pdf
 
 
 @router.get("/pdf-list/")
-def pdf_list(pdf_service: PDFService = Depends(get_pdf_service),
-             current_user=Depends(get_current_user)):
-    """Retrieves a list of all PDFs uploaded by the currently authenticated user."""
+async def pdf_list(pdf_service: PDFService = Depends(get_pdf_service),
+                   limit: int = Query(100, ge=1, le=1000, description="Number of PDFs per page"),
+                   cursor: Optional[str] = Query(None, description="Continuation token returned with the previous page"),
+                   current_user=Depends(get_current_user)):
+    """Retrieves the PDFs uploaded by the currently authenticated user, one page at a time."""
     try:
-        pdfs_data = pdf_service.list_pdfs_for_user(current_user.id)
-        return {"pdf_list": pdfs_data}
+        pdfs_data, next_cursor = await pdf_service.list_pdfs_for_user(current_user.id, limit, cursor)
+        return {"pdf_list": pdfs_data, "next_cursor": next_cursor}
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except PDFException as e:
         logging.error(f"Error listing PDFs for user {current_user.id}: {e.message}", exc_info=False)
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -78,7 +138,7 @@ async def pdf_parse(request: PDFSelectRequest, pdf_service: PDFService = Depends
       The extracted text is stored in the database.
       """
     try:
-        pdf_service.parse_pdf_text(request.pdf_id, current_user.id)
+        await pdf_service.parse_pdf_text(request.pdf_id, current_user.id)
         return {
             "message": f"PDF '{request.pdf_id}' parsed successfully for user {current_user.id}."
         }
@@ -92,12 +152,12 @@ async def pdf_parse(request: PDFSelectRequest, pdf_service: PDFService = Depends
 
 
 @router.post("/pdf-select/")
-def pdf_select(request: PDFSelectRequest, pdf_service: PDFService = Depends(get_pdf_service),
+async def pdf_select(request: PDFSelectRequest, pdf_service: PDFService = Depends(get_pdf_service),
 
                current_user=Depends(get_current_user)):
     """Marks a specific PDF as 'selected' for the currently authenticated user."""
     try:
-        pdf_service.select_pdf_for_user(request.pdf_id, current_user.id)
+        await pdf_service.select_pdf_for_user(request.pdf_id, current_user.id)
         return {"message": f"PDF '{request.pdf_id}' selected successfully for user {current_user.id}."}
     except PDFException as e:
         logging.error(f"Error selecting PDF '{request.pdf_id}' for user {current_user.id}: {e.message}", exc_info=False)
@@ -106,3 +166,35 @@ def pdf_select(request: PDFSelectRequest, pdf_service: PDFService = Depends(get_
         logging.critical(f"Unexpected error selecting PDF '{request.pdf_id}' for user {current_user.id}: {e}",
                          exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
+
+
+@router.get("/{pdf_id}/status", response_model=PDFStatusResponse)
+async def pdf_status(pdf_id: str, pdf_service: PDFService = Depends(get_pdf_service),
+               current_user=Depends(get_current_user)):
+    """Reports the state and timings of the background text extraction of a PDF."""
+    try:
+        return await pdf_service.get_extraction_status(pdf_id, current_user.id)
+    except PDFException as e:
+        logging.error(f"Error retrieving status of PDF '{pdf_id}' for user {current_user.id}: {e.message}",
+                      exc_info=False)
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logging.critical(f"Unexpected error retrieving status of PDF '{pdf_id}' for user {current_user.id}: {e}",
+                         exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
+
+
+@router.delete("/{pdf_id}")
+async def pdf_delete(pdf_id: str, pdf_service: PDFService = Depends(get_pdf_service),
+               current_user=Depends(get_current_user)):
+    """Deletes a PDF belonging to the currently authenticated user."""
+    try:
+        await pdf_service.delete_pdf(pdf_id, current_user.id)
+        return {"message": f"PDF '{pdf_id}' deleted successfully for user {current_user.id}."}
+    except PDFException as e:
+        logging.error(f"Error deleting PDF '{pdf_id}' for user {current_user.id}: {e.message}", exc_info=False)
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logging.critical(f"Unexpected error deleting PDF '{pdf_id}' for user {current_user.id}: {e}",
+                         exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected server error occurred.")
@@ -1,5 +1,5 @@
 from fastapi import Depends, APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.libs.services.auth import AuthService
 from app.schemas.user import TokenResponse, LoginRequest, UserResponse
@@ -13,9 +13,9 @@ router = APIRouter(
 auth_service = AuthService()
 
 @router.post("/register/", response_model=UserResponse)
-def create_user(user: LoginRequest, session: Session = Depends(get_session)):
-    return auth_service.register_user(user, session)
+async def create_user(user: LoginRequest, session: AsyncSession = Depends(get_session)):
+    return await auth_service.register_user(user, session)
 
 @router.post("/login/", response_model=TokenResponse)
-def login(request: LoginRequest, session: Session = Depends(get_session)):
-    return auth_service.login_user(request, session)
\ No newline at end of file
+async def login(request: LoginRequest, session: AsyncSession = Depends(get_session)):
+    return await auth_service.login_user(request, session)
\ No newline at end of file
@@ -0,0 +1,16 @@
+from typing import Any, Dict, List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class ProfilingRequest(BaseModel):
+    route: str = Field(..., description="Route template to profile, e.g. /chat/pdf-chat/")
+    count: int = Field(1, ge=1, le=100, description="Number of requests to profile")
+    mode: Literal["cprofile", "stack"] = "cprofile"
+    interval_ms: float = Field(5, ge=1, le=1000, description="Sampling interval of the stack sampler")
+
+
+class ProfilingStatusResponse(BaseModel):
+    armed: Dict[str, Dict[str, Any]]
+    active: bool
+    profiles: List[str]
@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 
 class MessageDirection(str, Enum):
@@ -20,6 +20,8 @@ class ChatHistoryBase(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    use_cache: bool = Field(True, description="Set to false to bypass the answer cache")
+    refresh_cache: bool = Field(False, description="Ignore the cached answer and replace it with a fresh one")
 
 
 class ChatResponse(BaseModel):
@@ -27,4 +29,9 @@ class ChatResponse(BaseModel):
     message: str
     direction: MessageDirection
     created_at: datetime
-    pdf_hash: Optional[str] = None
\ No newline at end of file
+    pdf_hash: Optional[str] = None
+
+
+class ChatHistoryPage(BaseModel):
+    items: List[ChatResponse]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
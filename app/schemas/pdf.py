@@ -1,5 +1,19 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class PDFSelectRequest(BaseModel):
     pdf_id: str
+
+
+class PDFStatusResponse(BaseModel):
+    pdf_id: str
+    state: str
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_ms: Optional[float] = None
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
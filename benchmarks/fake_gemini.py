@@ -0,0 +1,84 @@
+"""
+OpenAI-compatible stand-in for the Gemini endpoint, used by the load benchmark.
+
+Serves ``POST /v1/chat/completions`` (plain and streamed) with a configurable latency:
+
+- FAKE_GEMINI_LATENCY_MS: time before the first token (default 300)
+- FAKE_GEMINI_TOKENS_PER_SECOND: generation rate (default 50)
+- FAKE_GEMINI_ANSWER_TOKENS: number of tokens per answer (default 60)
+
+Run with ``uvicorn benchmarks.fake_gemini:app --port 8001``.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_SECONDS = float(os.environ.get("FAKE_GEMINI_LATENCY_MS", 300)) / 1000
+TOKENS_PER_SECOND = float(os.environ.get("FAKE_GEMINI_TOKENS_PER_SECOND", 50))
+ANSWER_TOKENS = int(os.environ.get("FAKE_GEMINI_ANSWER_TOKENS", 60))
+
+app = FastAPI()
+
+
+def _answer_tokens():
+    return [f"token{i} " for i in range(ANSWER_TOKENS)]
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    tokens = _answer_tokens()
+    await asyncio.sleep(LATENCY_SECONDS)
+
+    if body.get("stream"):
+        async def stream():
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for token in tokens:
+                await asyncio.sleep(1 / TOKENS_PER_SECOND)
+                yield _chunk(completion_id, model, {"content": token})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    await asyncio.sleep(len(tokens) / TOKENS_PER_SECOND)
+    prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(tokens)},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_chars // 4 + len(tokens)
+        }
+    }
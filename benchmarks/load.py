@@ -0,0 +1,252 @@
+"""
+End-to-end load benchmark.
+
+Starts the application (``main:app``) under uvicorn against local stand-ins:
+
+- the fake OpenAI-compatible Gemini server in ``benchmarks/fake_gemini.py``;
+- a SQLite file instead of PostgreSQL (or any ``--database-url``);
+- a throw-away database on a local MongoDB (``--mongo-uri``, e.g. ``docker run -p 27017:27017 mongo:6.0``).
+
+Each virtual user registers, logs in, uploads a synthetic PDF, waits for its extraction, parses and
+selects it, asks questions (plain and streamed; questions repeat so the answer cache is exercised),
+then reads its chat history and PDF list. The run is repeated at every concurrency level and the
+per-endpoint latency percentiles and throughput are printed as JSON, e.g.::
+
+    python -m benchmarks.load --concurrency 1,8,32 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.synthetic_pdf import make_pdf, synthetic_pages
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTIONS = [
+    "What are the payment terms?",
+    "Summarize the termination clause.",
+    "Who are the parties to the agreement?",
+    "What penalties apply to late delivery?",
+]
+
+
+class Recorder:
+    """Collects the latency of every call, per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request) -> Optional[httpx.Response]:
+        started_at = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started_at)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies[name])
+            result[name] = {
+                "count": len(samples),
+                "errors": self.errors[name],
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "p99_ms": _percentile(samples, 99),
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else None,
+                "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else None
+            }
+        return result
+
+
+def _percentile(sorted_samples: List[float], percentile: float) -> Optional[float]:
+    """Nearest-rank percentile, in milliseconds."""
+    if not sorted_samples:
+        return None
+    rank = max(math.ceil(percentile / 100 * len(sorted_samples)) - 1, 0)
+    return round(sorted_samples[rank] * 1000, 2)
+
+
+async def _user_session(client: httpx.AsyncClient, recorder: Recorder, pdf_bytes: bytes, args) -> None:
+    email = f"bench-{uuid.uuid4().hex}@example.com"
+    credentials = {"email": email, "password": "benchmark-password"}
+    await recorder.call("register", client.post("/users/register/", json=credentials))
+    response = await recorder.call("login", client.post("/users/login/", json=credentials))
+    if response is None or response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await recorder.call("upload", client.post(
+        "/pdf/pdf-upload/", headers=headers, files={"file": ("bench.pdf", pdf_bytes, "application/pdf")}
+    ))
+    if response is None or response.status_code != 200:
+        return
+    pdf_id = response.json()["file_id"]
+
+    deadline = time.perf_counter() + args.extraction_timeout
+    while time.perf_counter() < deadline:
+        response = await recorder.call("status", client.get(f"/pdf/{pdf_id}/status", headers=headers))
+        if response is None or response.json().get("state") in ("done", "failed", "not_started"):
+            break
+        await asyncio.sleep(0.05)
+
+    await recorder.call("parse", client.post("/pdf/pdf-parse/", headers=headers, json={"pdf_id": pdf_id}))
+    await recorder.call("select", client.post("/pdf/pdf-select/", headers=headers, json={"pdf_id": pdf_id}))
+
+    for i in range(args.chats):
+        question = {"message": QUESTIONS[i % len(QUESTIONS)]}
+        await recorder.call("chat", client.post("/chat/pdf-chat/", headers=headers, json=question))
+    for i in range(args.streams):
+        question = {"message": QUESTIONS[i % len(QUESTIONS)], "use_cache": False}
+        await recorder.call("chat_stream", _read_stream(client, headers, question))
+
+    await recorder.call("history", client.get("/chat/chat-history/", headers=headers))
+    await recorder.call("pdf_list", client.get("/pdf/pdf-list/", headers=headers))
+
+
+async def _read_stream(client: httpx.AsyncClient, headers: Dict[str, str], body: Dict[str, Any]) -> httpx.Response:
+    async with client.stream("POST", "/chat/pdf-chat/stream/", headers=headers, json=body) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return response
+
+
+async def run_level(base_url: str, concurrency: int, pdf_bytes: bytes, args) -> Dict[str, Any]:
+    """Runs ``args.sessions`` user sessions per virtual user, with ``concurrency`` virtual users."""
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        async def virtual_user():
+            for _ in range(args.sessions):
+                await _user_session(client, recorder, pdf_bytes, args)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+        wall_seconds = time.perf_counter() - started_at
+
+    return {
+        "concurrency": concurrency,
+        "wall_seconds": round(wall_seconds, 3),
+        "endpoints": recorder.summary(wall_seconds)
+    }
+
+
+def _start(command: List[str], env: Dict[str, str], health_url: str, timeout: float = 30) -> subprocess.Popen:
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=sys.stderr)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(command)} exited with code {process.returncode}")
+        try:
+            if httpx.get(health_url, timeout=1).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{' '.join(command)} did not become ready within {timeout}s")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _drop_mongo_database(mongo_uri: str, name: str) -> None:
+    from pymongo import MongoClient
+    with MongoClient(mongo_uri, serverSelectionTimeoutMS=2000) as client:
+        client.drop_database(name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--sessions", type=int, default=2, help="User sessions per virtual user and level")
+    parser.add_argument("--chats", type=int, default=4, help="Chat requests per session")
+    parser.add_argument("--streams", type=int, default=1, help="Streamed chat requests per session")
+    parser.add_argument("--pages", type=int, default=20, help="Pages of the synthetic PDF")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the application")
+    parser.add_argument("--app-port", type=int, default=8100)
+    parser.add_argument("--gemini-port", type=int, default=8101)
+    parser.add_argument("--gemini-latency-ms", type=float, default=300)
+    parser.add_argument("--gemini-tokens-per-second", type=float, default=50)
+    parser.add_argument("--database-url", default=None, help="SQLAlchemy URL (default: a temporary SQLite file)")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--extraction-timeout", type=float, default=60)
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    pdf_bytes = make_pdf(synthetic_pages(seed=1, page_count=args.pages))
+    mongo_db_name = f"pdf_bench_{uuid.uuid4().hex[:8]}"
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {
+            **os.environ,
+            "FAKE_GEMINI_LATENCY_MS": str(args.gemini_latency_ms),
+            "FAKE_GEMINI_TOKENS_PER_SECOND": str(args.gemini_tokens_per_second),
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_BASE_URL": f"http://127.0.0.1:{args.gemini_port}/v1/",
+            "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'bench.db')}",
+            "MONGO_URI": args.mongo_uri,
+            "MONGO_DB_NAME": mongo_db_name,
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret"),
+            # The database is created for this run, so its schema is created on startup.
+            "MIGRATE_ON_STARTUP": "true",
+        }
+        gemini = _start(
+            [sys.executable, "-m", "uvicorn", "benchmarks.fake_gemini:app", "--port", str(args.gemini_port)],
+            env, f"http://127.0.0.1:{args.gemini_port}/health"
+        )
+        app = None
+        try:
+            app = _start(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+                 "--workers", str(args.workers), "--log-level", "warning"],
+                env, f"http://127.0.0.1:{args.app_port}/docs"
+            )
+            base_url = f"http://127.0.0.1:{args.app_port}"
+            results = [asyncio.run(run_level(base_url, level, pdf_bytes, args)) for level in levels]
+        finally:
+            for process in (app, gemini):
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+            _drop_mongo_database(args.mongo_uri, mongo_db_name)
+
+    report = {
+        "git_commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": vars(args),
+        "levels": results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
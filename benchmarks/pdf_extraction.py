@@ -0,0 +1,168 @@
+"""
+PDF extraction micro-benchmark.
+
+Generates a deterministic synthetic corpus (small, text-heavy, many-page, many-font and
+malformed PDFs), runs every registered extraction path over it, and reports the median time,
+time per page and per MB, and peak Python memory (tracemalloc) of each (path, document) pair.
+
+Results are compared against a stored baseline; a metric worse than the baseline by more than
+its threshold is a regression and makes the command exit with status 1::
+
+    python -m benchmarks.pdf_extraction --update-baseline   # record the baseline on this machine
+    python -m benchmarks.pdf_extraction                     # compare against it
+
+New extraction paths (cached, alternative backends, ...) are benchmarked on the same corpus by
+adding them to `EXTRACTORS`.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from app.libs.exceptions.pdf import PDFException
+from app.libs.extractor import extract_text, shutdown_process_pool
+from benchmarks.synthetic_pdf import make_pdf, synthetic_pages
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "pdf_extraction.json")
+
+
+@dataclass
+class Document:
+    name: str
+    data: bytes
+    pages: int
+    malformed: bool = False
+
+
+def build_corpus() -> List[Document]:
+    """Returns the benchmark corpus; the bytes are identical on every run."""
+    text_heavy = make_pdf(synthetic_pages(seed=2, page_count=10, words_per_page=2000), words_per_line=20)
+    many_pages = make_pdf(synthetic_pages(seed=3, page_count=300, words_per_page=200))
+    return [
+        Document("small", make_pdf(synthetic_pages(seed=1, page_count=1, words_per_page=50)), 1),
+        Document("text_heavy", text_heavy, 10),
+        Document("many_pages", many_pages, 300),
+        Document("many_fonts", make_pdf(synthetic_pages(seed=4, page_count=20), font_count=12), 20),
+        Document("truncated", many_pages[:len(many_pages) * 3 // 5], 300, malformed=True),
+        Document("garbage", b"%PDF-1.4\n" + bytes(range(256)) * 64, 0, malformed=True),
+    ]
+
+
+# Extraction paths benchmarked on the corpus. Each takes the PDF bytes and returns the text.
+EXTRACTORS: Dict[str, Callable[[bytes], str]] = {
+    "serial": lambda data: extract_text(data, "benchmark", parallel_threshold=sys.maxsize),
+    # Falls back to the serial path when PDF_EXTRACTION_PROCESSES < 2.
+    "parallel": lambda data: extract_text(data, "benchmark", parallel_threshold=1),
+}
+
+
+def measure(extractor: Callable[[bytes], str], document: Document, repeat: int) -> Dict[str, Any]:
+    """Runs an extractor ``repeat`` times on a document and returns its timings and peak memory."""
+    timings = []
+    error = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        try:
+            extractor(document.data)
+        except PDFException as e:
+            error = e.message
+        timings.append(time.perf_counter() - started_at)
+
+    # Memory is measured on a separate run so tracing does not skew the timings.
+    tracemalloc.start()
+    try:
+        extractor(document.data)
+    except PDFException:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    size_mb = len(document.data) / (1024 * 1024)
+    return {
+        "median_ms": round(median * 1000, 3),
+        "ms_per_page": round(median * 1000 / document.pages, 3) if document.pages and not error else None,
+        "ms_per_mb": round(median * 1000 / size_mb, 3) if not error else None,
+        "peak_kb": round(peak / 1024, 1),
+        "size_kb": round(len(document.data) / 1024, 1),
+        "error": error,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, Any]]], baseline: Dict[str, Dict[str, Dict[str, Any]]],
+            time_threshold: float, memory_threshold: float) -> List[str]:
+    """
+    Returns the regressions of ``results`` against ``baseline``.
+
+    Args:
+        results: Measurements by extractor and document.
+        baseline: Stored measurements in the same shape.
+        time_threshold: Allowed relative increase of `median_ms` (0.2 = 20%).
+        memory_threshold: Allowed relative increase of `peak_kb`.
+    """
+    regressions = []
+    for extractor, documents in results.items():
+        for document, current in documents.items():
+            previous: Optional[Dict[str, Any]] = baseline.get(extractor, {}).get(document)
+            if previous is None:
+                continue
+            if bool(current["error"]) != bool(previous["error"]):
+                regressions.append(f"{extractor}/{document}: error changed from {previous['error']!r} "
+                                   f"to {current['error']!r}")
+            for metric, threshold in (("median_ms", time_threshold), ("peak_kb", memory_threshold)):
+                limit = previous[metric] * (1 + threshold)
+                if current[metric] > limit:
+                    regressions.append(f"{extractor}/{document}: {metric} {current[metric]} > {round(limit, 3)} "
+                                       f"(baseline {previous[metric]})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per extractor and document")
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS), help="Comma-separated extraction paths")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--time-threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="Allowed peak memory increase")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    try:
+        for name in args.extractors.split(","):
+            extractor = EXTRACTORS[name]
+            extractor(corpus[0].data)  # Warm-up (imports, process pool start)
+            results[name] = {document.name: measure(extractor, document, args.repeat) for document in corpus}
+    finally:
+        shutdown_process_pool()
+
+    regressions: List[str] = []
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.time_threshold, args.memory_threshold)
+
+    output = json.dumps({"results": results, "regressions": regressions}, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
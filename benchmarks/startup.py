@@ -0,0 +1,132 @@
+"""
+Cold start benchmark.
+
+Measures, over several fresh processes:
+
+- import time: how long ``import main`` takes in a new interpreter, plus the modules with the
+  largest self import time (from ``python -X importtime``);
+- readiness time: how long a new ``uvicorn main:app`` process takes, from spawn to answering
+  its first request (``GET /metrics``).
+
+No database is contacted: the application is pointed at a temporary SQLite file and a MongoDB
+URI that is never dialed, as neither is used before the first real request. The report is
+printed as JSON, e.g.::
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.load import REPO_ROOT, _git_commit
+
+_IMPORT_SNIPPET = "import time; started_at = time.perf_counter(); import main; print(time.perf_counter() - started_at)"
+
+
+def _summary(samples_ms: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(samples_ms), 1),
+        "min_ms": round(min(samples_ms), 1),
+        "max_ms": round(max(samples_ms), 1)
+    }
+
+
+def measure_import(env: Dict[str, str], runs: int) -> Dict[str, Any]:
+    """Times ``import main`` in ``runs`` fresh interpreters."""
+    samples_ms = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", _IMPORT_SNIPPET], cwd=REPO_ROOT, env=env, text=True)
+        samples_ms.append(float(output.strip().splitlines()[-1]) * 1000)
+    return _summary(samples_ms)
+
+
+def top_imports(env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Returns the top-level packages with the largest total self import time of ``import main``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=REPO_ROOT, env=env,
+        capture_output=True, text=True, check=True
+    )
+    self_us: Dict[str, int] = defaultdict(int)
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, package = line[len("import time:"):].split("|")
+        self_us[package.strip().split(".")[0]] += int(self_time)
+    ranked = sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "self_ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def measure_readiness(env: Dict[str, str], runs: int, port: int, timeout: float) -> Dict[str, Any]:
+    """Times ``runs`` uvicorn processes from spawn to their first successful response."""
+    samples_ms = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=sys.stderr
+        )
+        try:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                if time.perf_counter() - started_at > timeout:
+                    raise RuntimeError(f"uvicorn did not become ready within {timeout}s")
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+            samples_ms.append((time.perf_counter() - started_at) * 1000)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    return _summary(samples_ms)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list by import time")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds to wait for readiness")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'startup.db')}",
+            "MONGO_URI": os.environ.get("MONGO_URI", "mongodb://localhost:27017"),
+            "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret"),
+            "MIGRATE_ON_STARTUP": "false",
+        }
+        report = {
+            "git_commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "config": vars(args),
+            "import": measure_import(env, args.runs),
+            "top_imports": top_imports(env, args.top),
+            "readiness": measure_readiness(env, args.runs, args.port, args.timeout)
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Deterministic synthetic PDFs for the benchmarks (no third-party dependencies)."""
+import random
+from typing import List
+
+_VOCABULARY = (
+    "invoice contract payment clause party agreement term liability warranty delivery schedule price "
+    "customer supplier notice period renewal termination confidential data report revenue quarter "
+    "growth market product service support license fee penalty audit compliance policy review"
+).split()
+
+
+def synthetic_pages(seed: int, page_count: int, words_per_page: int = 300) -> List[str]:
+    """Returns ``page_count`` pages of pseudo-random words; the same seed always gives the same pages."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_VOCABULARY) for _ in range(words_per_page)) for _ in range(page_count)]
+
+
+_BASE_FONTS = [
+    "Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Times-Roman", "Times-Bold", "Times-Italic",
+    "Courier", "Courier-Bold", "Courier-Oblique", "Helvetica-BoldOblique", "Times-BoldItalic", "Courier-BoldOblique"
+]
+
+
+def make_pdf(pages: List[str], words_per_line: int = 12, font_count: int = 1) -> bytes:
+    """
+    Builds a minimal PDF with one text page per entry of ``pages``.
+
+    Args:
+        pages: The text of each page (letters, digits and spaces only).
+        words_per_line: Number of words per text line.
+        font_count: Number of fonts; consecutive lines cycle through them.
+
+    Returns:
+        The PDF content as bytes.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    first_font_id = 3 + 2 * len(pages)
+    fonts = " ".join(f"/F{k + 1} {first_font_id + k} 0 R" for k in range(font_count))
+    for i, text in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << {fonts} >> >> /Contents {4 + 2 * i} 0 R >>".encode()
+        )
+        words = text.split()
+        lines = [" ".join(words[j:j + words_per_line]) for j in range(0, len(words), words_per_line)]
+        body = " T* ".join(f"/F{n % font_count + 1} 10 Tf ({line}) Tj" for n, line in enumerate(lines))
+        stream = f"BT 12 TL 40 760 Td {body} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    for k in range(font_count):
+        base_font = _BASE_FONTS[k % len(_BASE_FONTS)]
+        objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} >>".encode())
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return out
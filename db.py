@@ -1,29 +1,104 @@
-import os
+from typing import Optional
 
-import gridfs
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from sqlmodel import SQLModel, create_engine, Session
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
+from app.config import settings
+from app.libs.metrics import register_pool
 from app.models.chat import Base
 
-load_dotenv()
+DB_NAME = settings.postgres_db
+DB_USER = settings.postgres_user
+DB_PASSWORD = settings.postgres_password
+DB_HOST = settings.postgres_host
+DB_PORT = settings.postgres_port
 
-DB_NAME = os.environ.get("POSTGRES_DB", None)
-DB_USER = os.environ.get("POSTGRES_USER", None)
-DB_PASSWORD = os.environ.get("POSTGRES_PASSWORD", None)
-DB_HOST = os.environ.get("POSTGRES_HOST", None)
+# Connection pool settings
+DB_POOL_SIZE = settings.postgres_pool_size
+DB_MAX_OVERFLOW = settings.postgres_max_overflow
+DB_POOL_TIMEOUT = settings.postgres_pool_timeout
+DB_POOL_RECYCLE = settings.postgres_pool_recycle
+DB_POOL_PRE_PING = settings.postgres_pool_pre_ping
+# Set to 0 when connecting through a transaction-pooling PgBouncer
+DB_STATEMENT_CACHE_SIZE = settings.postgres_statement_cache_size
+DB_ECHO = settings.sql_echo
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
-MONGO_DB_URL = os.environ.get("MONGO_URI", None)
+# DATABASE_URL overrides the POSTGRES_* settings (e.g. to run the benchmarks against SQLite)
+DATABASE_URL = settings.database_url or \
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+MONGO_DB_URL = settings.mongo_uri
+MONGO_DB_NAME = settings.mongo_db_name
+MONGO_MAX_POOL_SIZE = settings.mongo_max_pool_size
 
-engine = create_engine(DATABASE_URL, echo=True)
-client = MongoClient(MONGO_DB_URL)
+# The engine and the MongoDB client are created on first use, in the process that uses them, so
+# pre-forking servers (gunicorn) never share sockets or background threads between workers.
+_engine: Optional[AsyncEngine] = None
+_session_maker: Optional[async_sessionmaker] = None
+_mongo_client: Optional[AsyncIOMotorClient] = None
 
 
-def get_session():
-    with Session(engine) as session:
+def get_engine() -> AsyncEngine:
+    """Returns the process-wide SQLAlchemy engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            DATABASE_URL,
+            echo=DB_ECHO,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+            if DATABASE_URL.startswith("postgresql+asyncpg") else {}
+        )
+    return _engine
+
+
+def get_session_maker() -> async_sessionmaker:
+    """Returns the process-wide session factory, creating it on first use."""
+    global _session_maker
+    if _session_maker is None:
+        _session_maker = async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+    return _session_maker
+
+
+def get_mongo_client() -> AsyncIOMotorClient:
+    """Returns the process-wide MongoDB client, creating it on first use."""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(MONGO_DB_URL, maxPoolSize=MONGO_MAX_POOL_SIZE)
+    return _mongo_client
+
+
+def get_mongo_db() -> AsyncIOMotorDatabase:
+    """Returns the application's MongoDB database."""
+    return get_mongo_client()[MONGO_DB_NAME]
+
+
+async def close_databases() -> None:
+    """Disposes of the engine and closes the MongoDB client if they were created."""
+    global _engine, _session_maker, _mongo_client
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_maker = None
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+
+
+register_pool(
+    "sql_connections",
+    in_use=lambda: _engine.pool.checkedout() if _engine is not None and hasattr(_engine.pool, "checkedout") else 0,
+    capacity=lambda: DB_POOL_SIZE + DB_MAX_OVERFLOW
+)
+
+
+async def get_session():
+    async with get_session_maker()() as session:
         yield session
 
-def create_db_and_tables():
-    Base.metadata.create_all(engine)
+async def create_db_and_tables():
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
@@ -59,4 +59,11 @@ curl --location 'http://127.0.0.1:8000/chat/pdf-chat' \
 --header 'Authorization: Bearer <JWT_TOKEN>' \
 --data '{
   "message": "Can you explain this pdf?"
-}'
\ No newline at end of file
+}'
+# Chat Send (streaming)
+curl --no-buffer --location 'http://127.0.0.1:8000/chat/pdf-chat/stream/' \
+--header 'Content-Type: application/json' \
+--header 'Authorization: Bearer <JWT_TOKEN>' \
+--data '{
+  "message": "Can you explain this pdf?"
+}'
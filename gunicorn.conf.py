@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for the multi-worker deployment (``gunicorn -c gunicorn.conf.py main:app``).
+
+Every worker is a separate process running its own event loop: the database engine, the MongoDB
+client, the Gemini client and the worker pools are created lazily in each worker on first use,
+after the fork, never in the master (``preload_app`` stays off), and closed by the application
+lifespan on shutdown.
+
+Sizing (see "Sizing workers and pools" in the README) is read from the environment:
+
+- WEB_CONCURRENCY: worker processes (default: number of CPUs)
+- PDF_EXTRACTION_PROCESSES: extraction processes per worker (default: CPUs divided among the workers)
+- GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT: seconds before a silent worker is killed / a stopping
+  worker is killed (default 120 / 60); the graceful timeout should cover the longest chat stream
+"""
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", cpu_count))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 60))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycling workers bounds the growth of per-process caches and fragmentation.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+accesslog = "-"
+
+# Without this, every worker would start one extraction process per CPU and oversubscribe the machine.
+os.environ.setdefault("PDF_EXTRACTION_PROCESSES", str(max(1, cpu_count // workers)))
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} started")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"Worker {worker.pid} exited")
@@ -1,19 +1,69 @@
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI
 
-from app.routers import user, chat, pdf
-from db import create_db_and_tables
+from app.config import settings
+from app.libs.client import close_llm_client
+from app.libs.extractor import shutdown_process_pool
+from app.libs.limits import MULTIPART_OVERHEAD_BYTES, BodySizeLimitMiddleware
+from app.libs.metrics import MetricsMiddleware, register_pool
+from app.libs.tracing import TracingMiddleware
+from app.libs.password import shutdown_password_hasher
+from app.libs.services.admission import close_admission_controller
+from app.libs.services.chat import close_chat_history_writer
+from app.libs.services.gemini import close_answer_cache
+from app.libs.services.pdf import MAX_UPLOAD_BYTES
+from app.routers import user, chat, pdf, metrics, admin
+from app.migrate import migrate
+from app.routers.pdf import close_pdf_resources
+from db import close_databases
+
+# Threads shared by sync dependencies and file uploads (anyio's default is 40).
+THREADPOOL_SIZE = settings.threadpool_size
+
+
+def _threadpool_limiter() -> anyio.CapacityLimiter:
+    return anyio.to_thread.current_default_thread_limiter()
+
+
+register_pool(
+    "threadpool",
+    in_use=lambda: _threadpool_limiter().borrowed_tokens,
+    capacity=lambda: _threadpool_limiter().total_tokens,
+    waiting=lambda: _threadpool_limiter().statistics().tasks_waiting
+)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    # Clients and pools are created lazily on first use, in each worker process, never at import time (see
+    # gunicorn.conf.py); the lifespan only closes those that were created.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # The schema is created by `python -m app.migrate`, outside the startup path of every worker.
+    if settings.migrate_on_startup:
+        await migrate()
     yield
+    await close_pdf_resources()
+    await close_chat_history_writer()
+    shutdown_process_pool()
+    shutdown_password_hasher()
+    await close_llm_client()
+    close_answer_cache()
+    close_admission_controller()
+    await close_databases()
 
 
 app = FastAPI(lifespan=lifespan)
+# Oversized uploads are rejected before FastAPI parses the form; `PDFService.upload_pdf` checks the file itself.
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+                   paths=["/pdf/pdf-upload/"])
+# The last middleware added runs first: metrics resolve the route, tracing records the timeline within it.
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(user.router)
 app.include_router(chat.router)
 app.include_router(pdf.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
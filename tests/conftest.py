@@ -0,0 +1,182 @@
+"""
+Shared fixtures: the application runs in-process against an in-memory MongoDB (mongomock-motor),
+a temporary SQLite database and a fake Gemini client, so the tests need no running services.
+"""
+import os
+import tempfile
+
+# Settings are read once at import time, so the environment is set before the application is imported.
+_TMP_DIR = tempfile.mkdtemp(prefix="pdfchat-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(_TMP_DIR, 'test.db')}",
+    "SECRET_KEY": "test-secret",
+    "GEMINI_API_KEY": "test",
+    "CHAT_HISTORY_WRITE_MODE": "sync",
+    "MIGRATE_ON_STARTUP": "false",
+    "SLOW_REQUEST_LOG_PATH": os.path.join(_TMP_DIR, "slow_requests.log"),
+})
+
+import shutil
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+import pytest
+from bson import ObjectId
+from gridfs.errors import NoFile
+from mongomock_motor import AsyncMongoMockClient
+
+import main
+from app.libs.hash import get_current_user
+from app.libs.services import gemini, pdf as pdf_service_module
+from app.libs.services.extraction import ExtractionPipeline
+from app.libs.services.retrieval import ChunkIndex, ChunkIndexStore
+from app.libs.services.text_cache import TextCache
+from app.routers import pdf as pdf_router
+from app.routers.pdf import PDFResources
+from app.schemas.user import UserResponse
+from db import close_databases, create_db_and_tables
+
+USER = UserResponse(id=1, email="user@example.com")
+TEXT = "The payment terms are thirty days. The agreement ends after two years. Late delivery costs a penalty."
+
+# The Motor collection methods that each cost one round trip to MongoDB.
+_ROUND_TRIP_METHODS = (
+    "find_one", "find", "insert_one", "update_one", "delete_one", "find_one_and_update", "aggregate",
+    "count_documents",
+)
+
+
+class FakeGridFSBucket:
+    """In-memory stand-in for `AsyncIOMotorGridFSBucket` (mongomock has no GridFS)."""
+
+    def __init__(self, db=None):
+        self.files: Dict[ObjectId, bytes] = {}
+
+    def put(self, data: bytes) -> str:
+        file_id = ObjectId()
+        self.files[file_id] = data
+        return str(file_id)
+
+    async def open_download_stream(self, file_id: ObjectId):
+        if file_id not in self.files:
+            raise NoFile()
+        data = self.files[file_id]
+
+        class _GridOut:
+            async def read(self):
+                return data
+
+        return _GridOut()
+
+    async def delete(self, file_id: ObjectId) -> None:
+        self.files.pop(file_id, None)
+
+
+class FakeLLMClient:
+    """Answers every chat with a fixed response."""
+
+    def __init__(self):
+        self.calls: List[List[Dict[str, str]]] = []
+
+    async def chat(self, messages, model=None) -> str:
+        self.calls.append(messages)
+        return "The answer."
+
+    async def stream_chat(self, messages, model=None):
+        self.calls.append(messages)
+        for word in ("The ", "answer."):
+            yield word
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def mongo_db():
+    return AsyncMongoMockClient()["pdfchat_test"]
+
+
+@pytest.fixture
+def gridfs_bucket(monkeypatch):
+    bucket = FakeGridFSBucket()
+    monkeypatch.setattr(pdf_service_module, "AsyncIOMotorGridFSBucket", lambda db: bucket)
+    return bucket
+
+
+@pytest.fixture
+def mongo_calls(monkeypatch, mongo_db) -> List[Tuple[str, str, tuple]]:
+    """Records every MongoDB round trip as (collection, method, positional arguments)."""
+    calls: List[Tuple[str, str, tuple]] = []
+    collection_class = type(mongo_db["any"])
+    for method_name in _ROUND_TRIP_METHODS:
+        original = getattr(collection_class, method_name)
+
+        def counted(self, *args, _original=original, _name=method_name, **kwargs):
+            calls.append((self.name, _name, args))
+            return _original(self, *args, **kwargs)
+
+        monkeypatch.setattr(collection_class, method_name, counted)
+    return calls
+
+
+@pytest.fixture
+async def app(monkeypatch, mongo_db, gridfs_bucket):
+    """The application wired to the in-memory stores, with a fake Gemini client and a signed-in user."""
+    resources = PDFResources(
+        db=mongo_db,
+        text_cache=TextCache(mongo_db["pdf_text_cache"]),
+        chunk_index_store=ChunkIndexStore(mongo_db["pdf_chunk_index"]),
+        extraction_pipeline=ExtractionPipeline(mongo_db["pdf_extraction_jobs"])
+    )
+    monkeypatch.setattr(pdf_router, "_pdf_resources", resources)
+    monkeypatch.setattr(gemini, "_answer_cache", gemini.AnswerCache(mongo_db["answer_cache"]))
+    monkeypatch.setattr(gemini, "get_llm_client", FakeLLMClient)
+    main.app.dependency_overrides[get_current_user] = lambda: USER
+    await create_db_and_tables()
+    yield main.app
+    main.app.dependency_overrides.clear()
+    await resources.extraction_pipeline.shutdown()
+    await close_databases()
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http_client:
+        yield http_client
+
+
+@pytest.fixture
+def store_pdf(mongo_db, gridfs_bucket) -> Callable[[bytes, str], Awaitable[str]]:
+    """Returns a function storing a PDF the way an upload does (blob and metadata) and returning its ID."""
+    async def store(data: bytes, content_hash: str, user_id: int = USER.id) -> str:
+        pdf_id = gridfs_bucket.put(data)
+        await mongo_db["pdf_metadata"].insert_one({
+            "user_id": user_id,
+            "gridfs_id": pdf_id,
+            "filename": "document.pdf",
+            "content_hash": content_hash,
+            "size": len(data)
+        })
+        return pdf_id
+
+    return store
+
+
+@pytest.fixture
+async def selected_pdf(app, mongo_db, store_pdf) -> str:
+    """A selected PDF whose text and chunk index are already cached, as after its extraction."""
+    resources = pdf_router._pdf_resources
+    pdf_id = await store_pdf(b"%PDF-1.4 test", "content-hash")
+    await resources.text_cache.put("content-hash", TEXT)
+    await resources.chunk_index_store.put("content-hash", ChunkIndex.build(TEXT))
+    # Selections saved by earlier versions carry the full text, which must not be read back.
+    await mongo_db["user_pdf_selection"].insert_one(
+        {"user_id": USER.id, "selected_pdf_id": pdf_id, "full_text": TEXT}
+    )
+    return pdf_id
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
@@ -0,0 +1,35 @@
+"""The streaming chat endpoint takes its in-flight slot before the response starts."""
+import pytest
+
+from app.libs.services import admission
+from app.libs.services.admission import AdmissionController, FairQueue, InMemoryRateLimitBackend
+from tests.conftest import USER
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def controller(monkeypatch) -> AdmissionController:
+    """An admission controller with a single in-flight slot and no queue."""
+    controller = AdmissionController(InMemoryRateLimitBackend(), queue=FairQueue(capacity=1, max_queued_per_user=0))
+    monkeypatch.setattr(admission, "_admission_controller", controller)
+    return controller
+
+
+async def test_stream_is_rejected_with_429_when_the_queue_is_full(client, selected_pdf, controller):
+    await controller.queue.acquire(USER.id)
+
+    response = await client.post("/chat/pdf-chat/stream/", json={"message": "What are the payment terms?"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    controller.queue.release()
+    assert controller.queue.in_flight == 0
+
+
+async def test_stream_gives_its_slot_back(client, selected_pdf, controller):
+    response = await client.post("/chat/pdf-chat/stream/", json={"message": "What are the payment terms?"})
+
+    assert response.status_code == 200
+    assert "event: done" in response.text
+    assert controller.queue.in_flight == 0
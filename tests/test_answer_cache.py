@@ -0,0 +1,31 @@
+"""Repeated questions are answered from the answer cache, including within one conversation."""
+import pytest
+
+from app.libs.services import gemini
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def llm_client(monkeypatch):
+    client = gemini.get_llm_client()
+    monkeypatch.setattr(gemini, "get_llm_client", lambda: client)
+    return client
+
+
+async def test_repeated_question_in_a_conversation_hits_the_cache(client, selected_pdf, llm_client):
+    first = await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?"})
+    second = await client.post("/chat/pdf-chat/", json={"message": "what are the payment terms"})
+
+    assert first.json()["prompt_tokens"] is not None
+    assert second.json() == {"message": first.json()["message"], "prompt_tokens": None}
+    assert len(llm_client.calls) == 1
+
+
+async def test_history_messages_are_part_of_the_key(client, selected_pdf, llm_client, monkeypatch):
+    monkeypatch.setattr(gemini, "ANSWER_CACHE_HISTORY_MESSAGES", 2)
+
+    await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?"})
+    await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?"})
+
+    assert len(llm_client.calls) == 2
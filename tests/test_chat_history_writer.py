@@ -0,0 +1,88 @@
+"""
+Failed chat history batch inserts are retried with backoff, then dropped and counted; messages
+not written yet are still part of the conversation.
+"""
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.libs.services.chat import ChatHistoryService, ChatHistoryWriter
+from app.models.chat import MessageDirection
+from db import get_session_maker
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakySessionMaker:
+    """Session factory whose inserts fail a given number of times before succeeding."""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.inserted: List[Dict[str, Any]] = []
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, statement, rows):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.inserted.extend(rows)
+
+    async def commit(self):
+        pass
+
+
+ROWS = [{"user_id": 1, "message": "hello"}, {"user_id": 1, "message": "world"}]
+
+
+async def test_failed_batch_is_retried():
+    session_maker = FlakySessionMaker(failures=2)
+    writer = ChatHistoryWriter(session_maker, max_retries=3, retry_base_delay=0)
+    errors_before = REGISTRY.get_sample_value("pdfchat_chat_history_write_errors_total")
+
+    for row in ROWS:
+        await writer.write(row)
+    await writer.close()
+
+    assert session_maker.inserted == ROWS
+    assert REGISTRY.get_sample_value("pdfchat_chat_history_write_errors_total") - errors_before == 2
+
+
+async def test_batch_is_dropped_after_the_last_retry():
+    session_maker = FlakySessionMaker(failures=10)
+    writer = ChatHistoryWriter(session_maker, max_retries=2, retry_base_delay=0)
+    dropped_before = REGISTRY.get_sample_value("pdfchat_chat_history_dropped_messages_total")
+
+    for row in ROWS:
+        await writer.write(row)
+    await writer.close()
+
+    assert session_maker.inserted == []
+    assert session_maker.failures == 7
+    assert REGISTRY.get_sample_value("pdfchat_chat_history_dropped_messages_total") - dropped_before == len(ROWS)
+
+
+async def test_buffered_messages_are_part_of_the_conversation(app):
+    writer = ChatHistoryWriter(get_session_maker(), flush_interval=60)
+    async with get_session_maker()() as session:
+        service = ChatHistoryService(session, writer=writer)
+        await service.save_message(1, "What are the payment terms?", MessageDirection.OUTGOING, pdf_hash="hash")
+        await service.save_message(1, "Thirty days.", MessageDirection.INCOMING, pdf_hash="hash")
+        await service.save_message(1, "Another document.", MessageDirection.OUTGOING, pdf_hash="other")
+
+        buffered = await service.get_conversation(1, "hash", before=datetime.utcnow())
+        await writer.close()
+        stored = await service.get_conversation(1, "hash", before=datetime.utcnow())
+
+    assert [entry.message for entry in buffered] == ["Thirty days.", "What are the payment terms?"]
+    assert [entry.message for entry in stored] == ["Thirty days.", "What are the payment terms?"]
+    assert writer.pending(1) == []
@@ -0,0 +1,37 @@
+"""
+The chat path reads each piece of PDF data from MongoDB at most once per request (see
+`PDFRequestLoader` and the metadata memoization of `PDFService`).
+"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_chat_request_round_trips(client, selected_pdf, mongo_calls):
+    mongo_calls.clear()
+
+    response = await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?"})
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "The answer."
+    assert [(collection, method) for collection, method, _ in mongo_calls] == [
+        ("user_pdf_selection", "find_one"),
+        ("pdf_metadata", "find_one"),
+        ("answer_cache", "find_one"),
+        ("answer_cache", "update_one"),
+    ]
+    _, _, selection_args = mongo_calls[0]
+    assert selection_args[1]["full_text"] == 0
+
+
+async def test_chat_request_without_answer_cache_round_trips(client, selected_pdf, mongo_calls):
+    await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?", "use_cache": False})
+    mongo_calls.clear()
+
+    response = await client.post("/chat/pdf-chat/", json={"message": "Who are the parties?", "use_cache": False})
+
+    assert response.status_code == 200
+    assert [(collection, method) for collection, method, _ in mongo_calls] == [
+        ("user_pdf_selection", "find_one"),
+        ("pdf_metadata", "find_one"),
+    ]
@@ -0,0 +1,45 @@
+"""Extraction jobs lost with the process running them are queued again by the status endpoint."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.libs.services import pdf as pdf_service_module
+from app.routers import pdf as pdf_router
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def extracted_text(monkeypatch) -> str:
+    text = "The payment terms are thirty days."
+    monkeypatch.setattr(pdf_service_module, "extract_text", lambda pdf_bytes, pdf_id: text)
+    return text
+
+
+async def insert_job(mongo_db, owner: str, started_at: datetime) -> None:
+    await mongo_db["pdf_extraction_jobs"].insert_one({
+        "_id": "content-hash", "state": "running", "owner": owner, "queued_at": started_at, "started_at": started_at
+    })
+
+
+async def test_job_lost_in_a_restart_is_resubmitted(client, mongo_db, store_pdf, extracted_text):
+    pdf_id = await store_pdf(b"%PDF-1.4 test", "content-hash")
+    await insert_job(mongo_db, "stopped-worker", datetime.now(timezone.utc) - timedelta(hours=1))
+
+    response = await client.get(f"/pdf/{pdf_id}/status")
+
+    assert response.json()["state"] == "queued"
+    pipeline = pdf_router._pdf_resources.extraction_pipeline
+    await pipeline.wait(pipeline.get_in_flight("content-hash"))
+    assert (await client.get(f"/pdf/{pdf_id}/status")).json()["state"] == "done"
+    assert await pdf_router._pdf_resources.text_cache.get("content-hash") == extracted_text
+
+
+async def test_recent_job_of_another_worker_is_left_alone(client, mongo_db, store_pdf, extracted_text):
+    pdf_id = await store_pdf(b"%PDF-1.4 test", "content-hash")
+    await insert_job(mongo_db, "other-worker", datetime.now(timezone.utc))
+
+    response = await client.get(f"/pdf/{pdf_id}/status")
+
+    assert response.json()["state"] == "running"
+    assert pdf_router._pdf_resources.extraction_pipeline.get_in_flight("content-hash") is None
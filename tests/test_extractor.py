@@ -0,0 +1,47 @@
+"""Parallel extraction on the process pool: worker failures surface as `PDFParsingException`."""
+import os
+
+import pytest
+
+from app.libs import extractor
+from app.libs.exceptions.pdf import PDFParsingException
+from benchmarks.synthetic_pdf import make_pdf
+
+PAGES = ["first page text", "second page text", "third page text"]
+
+
+def _crash_worker(pdf_path: str, start: int, stop: int):
+    os._exit(1)
+
+
+@pytest.fixture(autouse=True)
+def parallel_extraction(monkeypatch):
+    monkeypatch.setattr(extractor, "EXTRACTION_PROCESSES", 2)
+    yield
+    extractor.shutdown_process_pool()
+
+
+def extract(pdf_bytes: bytes) -> str:
+    return extractor.extract_text(pdf_bytes, "test", parallel_threshold=1, pages_per_chunk=1)
+
+
+def test_pages_are_extracted_in_order():
+    assert extract(make_pdf(PAGES)).split("\n")[:-1] == PAGES
+
+
+def test_pool_is_rebuilt_after_a_worker_dies(monkeypatch):
+    pdf_bytes = make_pdf(PAGES)
+    with monkeypatch.context() as patch:
+        patch.setattr(extractor, "_extract_page_range", _crash_worker)
+        with pytest.raises(PDFParsingException):
+            extract(pdf_bytes)
+    assert extractor._process_pool is None
+
+    assert extract(pdf_bytes).split("\n")[:-1] == PAGES
+
+
+def test_worker_errors_are_wrapped(monkeypatch):
+    monkeypatch.setattr(extractor, "_extract_page_range", len)
+
+    with pytest.raises(PDFParsingException):
+        extract(make_pdf(PAGES))
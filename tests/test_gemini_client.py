@@ -0,0 +1,82 @@
+"""
+The real `GeminiClient` against an OpenAI-compatible stand-in served by `httpx.MockTransport`,
+directly and behind both chat endpoints.
+"""
+import json
+
+import httpx
+import pytest
+
+from app.libs.client import GeminiClient
+from app.libs.services import gemini
+
+pytestmark = pytest.mark.anyio
+
+ANSWER = ["The payment ", "terms are ", "thirty days."]
+
+
+def _completions(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if not body.get("stream"):
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(ANSWER)},
+                         "finish_reason": "stop"}],
+        })
+    events = [{"content": delta} for delta in ANSWER]
+    chunks = "".join(
+        "data: " + json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+        }) + "\n\n"
+        for delta in events
+    )
+    return httpx.Response(200, content=chunks + "data: [DONE]\n\n", headers={"Content-Type": "text/event-stream"})
+
+
+@pytest.fixture
+async def gemini_client():
+    client = GeminiClient(transport=httpx.MockTransport(_completions))
+    yield client
+    await client.close()
+
+
+@pytest.fixture
+def real_llm_client(monkeypatch, gemini_client) -> GeminiClient:
+    monkeypatch.setattr(gemini, "get_llm_client", lambda: gemini_client)
+    return gemini_client
+
+
+async def test_chat(gemini_client):
+    answer = await gemini_client.chat([{"role": "user", "content": "What are the payment terms?"}])
+
+    assert answer == "".join(ANSWER)
+    assert gemini_client.active == 0
+
+
+async def test_stream_chat(gemini_client):
+    deltas = [delta async for delta in gemini_client.stream_chat([{"role": "user", "content": "Terms?"}])]
+
+    assert deltas == ANSWER
+    assert gemini_client.active == 0
+
+
+async def test_chat_endpoint(client, selected_pdf, real_llm_client):
+    response = await client.post("/chat/pdf-chat/", json={"message": "What are the payment terms?"})
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "".join(ANSWER)
+
+
+async def test_chat_stream_endpoint(client, selected_pdf, real_llm_client):
+    response = await client.post("/chat/pdf-chat/stream/", json={"message": "What are the payment terms?"})
+
+    assert response.status_code == 200
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events == ["token"] * len(ANSWER) + ["done"]
@@ -0,0 +1,13 @@
+"""The /metrics endpoint exposes the utilization of every pool, including the worker threadpool."""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_threadpool_gauges(client):
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    for gauge in ("pdfchat_pool_in_use", "pdfchat_pool_capacity", "pdfchat_pool_waiting"):
+        assert any(line.startswith(f'{gauge}{{pool="threadpool"}} ') for line in lines), gauge
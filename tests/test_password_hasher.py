@@ -0,0 +1,46 @@
+"""The password hasher records the running time of its jobs and rejects jobs beyond its queue."""
+import pytest
+from prometheus_client import REGISTRY
+
+from app.libs import password
+from app.libs.password import PasswordHasher, PasswordHasherBusyException
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt(monkeypatch):
+    from passlib.context import CryptContext
+    monkeypatch.setattr(password, "_pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=4))
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def test_job_durations_are_recorded():
+    hasher = PasswordHasher(kind="thread", max_workers=1, max_pending=2)
+    hashes_before = _sample("pdfchat_password_hash_seconds_count", operation="hash")
+    verifies_before = _sample("pdfchat_password_hash_seconds_count", operation="verify")
+    try:
+        hashed = await hasher.hash("secret")
+        verified, _ = await hasher.verify_and_update("secret", hashed)
+    finally:
+        hasher.shutdown()
+
+    assert verified
+    assert _sample("pdfchat_password_hash_seconds_count", operation="hash") - hashes_before == 1
+    assert _sample("pdfchat_password_hash_seconds_count", operation="verify") - verifies_before == 1
+    assert hasher.pending == 0
+
+
+async def test_jobs_beyond_the_queue_are_rejected():
+    hasher = PasswordHasher(kind="thread", max_workers=1, max_pending=0)
+    rejected_before = _sample("pdfchat_password_hash_rejected_total")
+    try:
+        with pytest.raises(PasswordHasherBusyException):
+            await hasher.hash("secret")
+    finally:
+        hasher.shutdown()
+
+    assert _sample("pdfchat_password_hash_rejected_total") - rejected_before == 1
@@ -0,0 +1,46 @@
+"""
+Lightweight endpoints stay fast while a large PDF is being parsed: extraction runs off the
+event loop (see `ExtractionPipeline`), so it never blocks other requests.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.libs.services import pdf as pdf_service_module
+
+pytestmark = pytest.mark.anyio
+
+EXTRACTION_SECONDS = 1.0
+# Generous for an in-memory request, far below the extraction time.
+MAX_LIST_SECONDS = 0.25
+
+
+async def test_pdf_list_stays_fast_during_parse(client, store_pdf, monkeypatch):
+    extraction_started = threading.Event()
+
+    def slow_extract_text(pdf_bytes: bytes, pdf_id: str) -> str:
+        # Blocking on purpose: it would stall every request if it ran on the event loop.
+        extraction_started.set()
+        time.sleep(EXTRACTION_SECONDS)
+        return "Extracted text of a large document."
+
+    monkeypatch.setattr(pdf_service_module, "extract_text", slow_extract_text)
+    pdf_id = await store_pdf(b"%PDF-1.4 large", "large-content-hash")
+
+    parse = asyncio.create_task(client.post("/pdf/pdf-parse/", json={"pdf_id": pdf_id}))
+    while not extraction_started.is_set():
+        await asyncio.sleep(0.01)
+
+    started_at = time.perf_counter()
+    response = await client.get("/pdf/pdf-list/")
+    list_seconds = time.perf_counter() - started_at
+
+    assert response.status_code == 200
+    assert [pdf["file_id"] for pdf in response.json()["pdf_list"]] == [pdf_id]
+    assert list_seconds < MAX_LIST_SECONDS
+    assert not parse.done()
+
+    parse_response = await parse
+    assert parse_response.status_code == 200
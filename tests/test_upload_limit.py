@@ -0,0 +1,64 @@
+"""
+Oversized uploads are rejected with a 413 by `BodySizeLimitMiddleware` before the form is parsed,
+so their body is never read into the spooled temporary file.
+"""
+import httpx
+import pytest
+
+from app.libs.limits import MULTIPART_OVERHEAD_BYTES, BodySizeLimitMiddleware
+from app.libs.services.pdf import MAX_UPLOAD_BYTES
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_upload_with_oversized_content_length_is_rejected_unread(app, gridfs_bucket):
+    body_reads = 0
+    messages = []
+
+    async def receive():
+        nonlocal body_reads
+        body_reads += 1
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/pdf/pdf-upload/", "raw_path": b"/pdf/pdf-upload/", "root_path": "", "query_string": b"",
+        "server": ("test", 80), "client": ("127.0.0.1", 1234),
+        "headers": [
+            (b"content-type", b"multipart/form-data; boundary=x"),
+            (b"content-length", str(MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES + 1).encode()),
+        ],
+    }
+    await app(scope, receive, send)
+
+    assert messages[0]["status"] == 413
+    assert body_reads == 0
+    assert gridfs_bucket.files == {}
+
+
+async def test_chunked_upload_is_cut_off_at_the_limit(app, gridfs_bucket):
+    # The real application behind a small limit, so the upload route parses the form as usual.
+    limited_app = BodySizeLimitMiddleware(app, max_bytes=4096, paths=["/pdf/pdf-upload/"])
+    chunks_sent = 0
+
+    async def multipart_body():
+        nonlocal chunks_sent
+        yield (b'--x\r\nContent-Disposition: form-data; name="file"; filename="large.pdf"\r\n'
+               b"Content-Type: application/pdf\r\n\r\n%PDF-1.4 ")
+        for _ in range(100):
+            chunks_sent += 1
+            yield b"x" * 512
+        yield b"\r\n--x--\r\n"
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limited_app), base_url="http://test") as client:
+        response = await client.post(
+            "/pdf/pdf-upload/", content=multipart_body(),
+            headers={"Content-Type": "multipart/form-data; boundary=x"}
+        )
+
+    assert response.status_code == 413
+    assert chunks_sent < 100
+    assert gridfs_bucket.files == {}